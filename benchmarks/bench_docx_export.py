@@ -0,0 +1,80 @@
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from docx import Document
+
+from modules.export_utils import export_swot_docx
+
+VERDICTS = [
+    "Продвигать - окупается за год",
+    "Доработать - нужен расчёт окупаемости",
+    "Отклонить - высокие риски",
+    "Ошибка",
+]
+
+
+def _frame(rows: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "№": list(range(1, rows + 1)),
+            "Тезис": [f"Тезис номер {i}: запустить пилот в регионе и оценить спрос" for i in range(rows)],
+            "Эффект": ["Рост выручки в регионе, проверка гипотезы спроса. " * 2] * rows,
+            "Риски": ["Высокие затраты на запуск, нехватка персонала. " * 2] * rows,
+            "Вердикт": [VERDICTS[i % len(VERDICTS)] for i in range(rows)],
+            "Категория": [VERDICTS[i % len(VERDICTS)].split(" - ")[0] for i in range(rows)],
+            "Статус": ["Готово"] * rows,
+        }
+    )
+
+
+def legacy_export_swot_docx(df: pd.DataFrame) -> bytes:
+    # Прежний путь: таблица на все строки сразу и заполнение через table.rows[i].cells
+    doc = Document()
+    doc.add_heading("Отчёт по SWOT-анализу предложений", 0)
+    doc.add_heading("Детальный анализ", level=1)
+    table = doc.add_table(rows=1 + len(df), cols=len(df.columns))
+    table.style = "Table Grid"
+    hdr = table.rows[0].cells
+    for i, col_name in enumerate(df.columns):
+        hdr[i].text = str(col_name)
+        for p in hdr[i].paragraphs:
+            p.runs[0].bold = True
+    for row_idx, (_, r) in enumerate(df.iterrows(), start=1):
+        row_cells = table.rows[row_idx].cells
+        for col_idx, val in enumerate(r):
+            row_cells[col_idx].text = str(val) if pd.notna(val) else ""
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def _measure(build, df: pd.DataFrame) -> tuple[float, int]:
+    started = time.perf_counter()
+    size = len(build(df))
+    return time.perf_counter() - started, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Скорость выгрузки SWOT в DOCX")
+    parser.add_argument("--rows", type=int, nargs="+", default=[500, 1000, 2000])
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+    for rows in args.rows:
+        df = _frame(rows)
+        new_time, new_size = _measure(export_swot_docx, df)
+        print(f"Строк: {rows}")
+        print(f"  Пакетная вставка XML: {new_time:.3f} с, {new_size} байт")
+        if not args.skip_legacy:
+            legacy_time, legacy_size = _measure(legacy_export_swot_docx, df)
+            print(f"  Прежняя выгрузка:     {legacy_time:.3f} с, {legacy_size} байт")
+            print(f"  Ускорение: x{legacy_time / new_time:.1f}")
+
+
+if __name__ == "__main__":
+    main()
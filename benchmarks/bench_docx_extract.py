@@ -0,0 +1,101 @@
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+
+from core.config import MAX_CONTEXT_CHARS
+from services.file_parser import CELL_SEPARATOR, _read_text
+
+
+KEY_TABLE_ROWS = [
+    ["Показатель", "План", "Факт"],
+    ["Выручка, млн", "1200", "1135"],
+    ["Доля рынка", "18%", "16,5%"],
+    ["Отток клиентов", "6%", "9%"],
+]
+
+
+def _make_docx(paragraphs: int, tables: int, rows: int) -> bytes:
+    # В начале раздатки — таблица ключевых показателей, она укладывается в лимит
+    # символов; дальше абзацы вперемешку с большими таблицами
+    doc = Document()
+    doc.add_heading("Раздаточный материал стратегической сессии", 0)
+    doc.add_paragraph("Ключевые показатели за год:")
+    key_table = doc.add_table(rows=len(KEY_TABLE_ROWS), cols=3)
+    for row, values in zip(key_table.rows, KEY_TABLE_ROWS):
+        for cell, value in zip(row.cells, values):
+            cell.text = value
+    for t in range(tables):
+        for i in range(paragraphs // max(tables, 1)):
+            doc.add_paragraph(
+                f"Абзац {t}.{i}: рынок растёт, конкуренты снижают цены, "
+                "нужна программа удержания ключевых клиентов."
+            )
+        table = doc.add_table(rows=rows, cols=3)
+        for r, row in enumerate(table.rows):
+            row.cells[0].text = f"Показатель {r}"
+            row.cells[1].text = str(1000 + r * 17)
+            row.cells[2].text = f"{r % 7 + 1}%"
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def _key_rows_found(text: str) -> int:
+    return sum(CELL_SEPARATOR.join(values) in text for values in KEY_TABLE_ROWS)
+
+
+def legacy_read_docx(raw: bytes, max_chars: int) -> str:
+    # Прежний путь: полная объектная модель python-docx, таблицы теряются
+    doc = Document(io.BytesIO(raw))
+    out = "\n".join(p.text for p in doc.paragraphs)
+    return out[:max_chars] if len(out) > max_chars else out
+
+
+def _measure(read, raw: bytes, max_chars: int, repeat: int) -> tuple[float, str]:
+    best = float("inf")
+    text = ""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        text = read(raw, max_chars)
+        best = min(best, time.perf_counter() - started)
+    return best, text
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Извлечение текста из DOCX для контекста чата")
+    parser.add_argument("--paragraphs", type=int, default=2000)
+    parser.add_argument("--tables", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=30)
+    parser.add_argument("--max-chars", type=int, default=MAX_CONTEXT_CHARS)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    raw = _make_docx(args.paragraphs, args.tables, args.rows)
+    legacy_time, legacy_text = _measure(legacy_read_docx, raw, args.max_chars, args.repeat)
+    new_time, new_text = _measure(
+        lambda data, limit: _read_text("file.docx", data, limit), raw, args.max_chars, args.repeat
+    )
+    print(f"Файл: {len(raw) / 1024:.0f} КБ, лимит {args.max_chars} символов")
+    print(
+        f"python-docx:         {legacy_time * 1000:.1f} мс, символов {len(legacy_text)}, "
+        f"строк таблицы показателей {_key_rows_found(legacy_text)} из {len(KEY_TABLE_ROWS)}"
+    )
+    print(
+        f"Потоковый iterparse: {new_time * 1000:.1f} мс, символов {len(new_text)}, "
+        f"строк таблицы показателей {_key_rows_found(new_text)} из {len(KEY_TABLE_ROWS)}"
+    )
+    assert _key_rows_found(new_text) == len(KEY_TABLE_ROWS), "таблица показателей не попала в текст"
+    print(f"Ускорение: x{legacy_time / new_time:.1f}")
+    whole_time, _ = _measure(
+        lambda data, limit: _read_text("file.docx", data, limit), raw, 10 ** 9, args.repeat
+    )
+    print(f"Весь документ без лимита: {whole_time * 1000:.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from streamlit.dataframe_util import convert_pandas_df_to_arrow_bytes
+
+from core.config import SWOT_PROGRESS_ROWS
+from services.results_buffer import ResultsBuffer
+
+
+def _row(i: int) -> dict:
+    return {
+        "№": i + 1,
+        "Тезис": f"Тезис номер {i}: запустить пилот в регионе и оценить спрос",
+        "Эффект": "Рост выручки в регионе, проверка гипотезы спроса. " * 2,
+        "Риски": "Высокие затраты на запуск, нехватка персонала. " * 2,
+        "Вердикт": "Доработать - нужен расчёт окупаемости",
+        "Категория": "Доработать",
+        "Статус": "Готово",
+    }
+
+
+def bench_full_table(rows: list[dict]) -> tuple[float, list[int]]:
+    # Прежний путь: на каждом опросе вся таблица готовых строк уходит в браузер
+    sent = []
+    started = time.perf_counter()
+    for done in range(1, len(rows) + 1):
+        sent.append(len(convert_pandas_df_to_arrow_bytes(pd.DataFrame(rows[:done]))))
+    return time.perf_counter() - started, sent
+
+
+def bench_tail(rows: list[dict], count: int) -> tuple[float, list[int]]:
+    # Новый путь: строка дописывается в колоночный буфер, в браузер уходит хвост
+    buffer = ResultsBuffer()
+    sent = []
+    started = time.perf_counter()
+    for row in rows:
+        buffer.append(row)
+        sent.append(len(convert_pandas_df_to_arrow_bytes(buffer.tail(count))))
+    return time.perf_counter() - started, sent
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Объём и время одного опроса экрана прогресса SWOT (опрос после каждой строки)"
+    )
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--tail", type=int, default=SWOT_PROGRESS_ROWS)
+    args = parser.parse_args()
+    rows = [_row(i) for i in range(args.rows)]
+    full_time, full_sent = bench_full_table(rows)
+    tail_time, tail_sent = bench_tail(rows, args.tail)
+    print(f"Строк: {args.rows}, опросов: {args.rows}")
+    print(
+        f"Вся таблица: {full_time:.3f} с, последний опрос {full_sent[-1] / 1024:.0f} КБ, "
+        f"за прогон {sum(full_sent) / 1024 / 1024:.1f} МБ"
+    )
+    print(
+        f"Хвост {args.tail} строк: {tail_time:.3f} с, последний опрос {tail_sent[-1] / 1024:.0f} КБ, "
+        f"за прогон {sum(tail_sent) / 1024 / 1024:.1f} МБ"
+    )
+    print(f"Ускорение: x{full_time / tail_time:.1f}, трафик меньше в x{sum(full_sent) / sum(tail_sent):.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from modules.export_utils import SwotStreamParser, parse_swot_response
+
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures", "swot_responses.json")
+
+
+def _legacy_strip_markdown(s: str) -> str:
+    if not s:
+        return ""
+    s = re.sub(r"\*\*([^*]+)\*\*", r"\1", s)
+    s = re.sub(r"\*([^*]+)\*", r"\1", s)
+    s = re.sub(r"__([^_]+)__", r"\1", s)
+    s = re.sub(r"_([^_]+)_", r"\1", s)
+    return s.strip()
+
+
+_LEGACY_FIELDS = (
+    ("ТЕЗИС:", "Тезис"),
+    ("ЭФФЕКТ:", "Эффект"),
+    ("РИСКИ:", "Риски"),
+    ("ВЕРДИКТ:", "Вердикт"),
+)
+
+
+def legacy_parse_swot_response(thesis: str, raw_response: str) -> dict:
+    # Прежний разбор: split по «---», upper каждой строки и проверка четырёх префиксов
+    result = {"Тезис": thesis[:500], "Эффект": "", "Риски": "", "Вердикт": "", "Статус": "Готово"}
+    text = (raw_response or "").strip()
+    for block in text.split("---"):
+        block = block.strip()
+        if not block:
+            continue
+        for line in block.split("\n"):
+            line = line.strip()
+            upper = line.upper()
+            for prefix, name in _LEGACY_FIELDS:
+                if upper.startswith(prefix):
+                    value = _legacy_strip_markdown(line[len(prefix):].strip())
+                    if name == "Тезис":
+                        value = value or _legacy_strip_markdown(thesis[:500])
+                    result[name] = value
+                    break
+    if not result["Вердикт"] and text:
+        verdict_match = re.search(
+            r"(Продвигать|Доработать|Отклонить)[\s\-—:]*([^\n]*)", text, re.IGNORECASE
+        )
+        if verdict_match:
+            result["Вердикт"] = _legacy_strip_markdown(
+                f"{verdict_match.group(1)} - {verdict_match.group(2).strip()}"
+            )
+    return result
+
+
+def _stream(thesis: str, response: str, chunk: int) -> dict:
+    parser = SwotStreamParser(thesis)
+    for i in range(0, len(response), chunk):
+        parser.feed(response[i:i + chunk])
+    return parser.finalize()
+
+
+def _measure(parse, cases: list, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for case in cases:
+            parse(case["thesis"], case["response"])
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Скорость разбора ответов SWOT")
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--chunk", type=int, default=8, help="размер куска потока, символов")
+    args = parser.parse_args()
+    with open(FIXTURES, encoding="utf-8") as f:
+        cases = json.load(f)
+
+    # Потоковый разбор обязан давать ту же строку, что и разбор целого ответа
+    for case in cases:
+        full = parse_swot_response(case["thesis"], case["response"])
+        if _stream(case["thesis"], case["response"], args.chunk) != full:
+            raise SystemExit(f"Потоковый разбор расходится на «{case['name']}»")
+        legacy = legacy_parse_swot_response(case["thesis"], case["response"])
+        found = sum(1 for k in ("Эффект", "Риски", "Вердикт") if full[k])
+        found_legacy = sum(1 for k in ("Эффект", "Риски", "Вердикт") if legacy[k])
+        print(f"{case['name']:<32} полей: {found_legacy} -> {found}")
+
+    total = args.repeat * len(cases)
+    legacy_time = _measure(legacy_parse_swot_response, cases, args.repeat)
+    new_time = _measure(parse_swot_response, cases, args.repeat)
+    stream_time = _measure(lambda t, r: _stream(t, r, args.chunk), cases, args.repeat)
+    print(f"Ответов: {total}")
+    print(f"Прежний разбор:      {legacy_time / total * 1e6:.1f} мкс/ответ")
+    print(f"Однопроходный:       {new_time / total * 1e6:.1f} мкс/ответ")
+    print(f"Потоковый (по {args.chunk} симв.): {stream_time / total * 1e6:.1f} мкс/ответ")
+
+
+if __name__ == "__main__":
+    main()
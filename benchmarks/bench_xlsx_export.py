@@ -0,0 +1,111 @@
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+from modules.export_utils import export_swot_xlsx
+
+VERDICTS = [
+    "Продвигать - окупается за год",
+    "Доработать - нужен расчёт окупаемости",
+    "Отклонить - высокие риски",
+    "Ошибка",
+]
+
+
+def _frame(rows: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "№": list(range(1, rows + 1)),
+            "Тезис": [f"Тезис номер {i}: запустить пилот в регионе и оценить спрос" for i in range(rows)],
+            "Эффект": ["Рост выручки в регионе, проверка гипотезы спроса. " * 2] * rows,
+            "Риски": ["Высокие затраты на запуск, нехватка персонала. " * 2] * rows,
+            "Вердикт": [VERDICTS[i % len(VERDICTS)] for i in range(rows)],
+            "Категория": [VERDICTS[i % len(VERDICTS)].split(" - ")[0] for i in range(rows)],
+            "Статус": ["Готово"] * rows,
+        }
+    )
+
+
+def _verdict_color(verdict: str) -> str:
+    v = (verdict or "").strip().upper()
+    if "ПРОДВИГАТЬ" in v:
+        return "C6EFCE"
+    if "ДОРАБОТАТЬ" in v:
+        return "FFEB9C"
+    if "ОТКЛОНИТЬ" in v:
+        return "FFC7CE"
+    return "FFFFFF"
+
+
+def legacy_export_swot_xlsx(df: pd.DataFrame) -> bytes:
+    # Прежний путь: to_excel в обычную книгу, затем повторные обходы листа
+    # с отдельными объектами стилей на каждую ячейку
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+        total = len(df)
+        v_series = df["Вердикт"].fillna("").astype(str).str.upper()
+        summary_data = [
+            ["Показатель", "Значение"],
+            ["Всего предложений", total],
+            ["Продвигать", int(v_series.str.contains("ПРОДВИГАТЬ").sum())],
+            ["Доработать", int(v_series.str.contains("ДОРАБОТАТЬ").sum())],
+            ["Отклонить", int(v_series.str.contains("ОТКЛОНИТЬ").sum())],
+        ]
+        pd.DataFrame(summary_data).to_excel(writer, sheet_name="Сводка", index=False, header=False)
+        summary_sheet = writer.sheets["Сводка"]
+        for col in range(1, summary_sheet.max_column + 1):
+            summary_sheet.cell(1, col).font = Font(bold=True, color="FFFFFF")
+            summary_sheet.cell(1, col).fill = PatternFill(start_color="1E3A5F", end_color="1E3A5F", fill_type="solid")
+        df.to_excel(writer, sheet_name="SWOT-анализ", index=False)
+        sheet = writer.sheets["SWOT-анализ"]
+        for col in range(1, sheet.max_column + 1):
+            cell = sheet.cell(1, col)
+            cell.fill = PatternFill(start_color="1E3A5F", end_color="1E3A5F", fill_type="solid")
+            cell.font = Font(bold=True, color="FFFFFF")
+        verdict_col = list(df.columns).index("Вердикт") + 1
+        for row in range(2, sheet.max_row + 1):
+            cell = sheet.cell(row, verdict_col)
+            color = _verdict_color(cell.value or "")
+            cell.fill = PatternFill(start_color=color, end_color=color, fill_type="solid")
+        for col in range(1, sheet.max_column + 1):
+            sheet.column_dimensions[get_column_letter(col)].width = 20
+        for row in sheet.iter_rows(min_row=1, max_row=sheet.max_row, min_col=1, max_col=sheet.max_column):
+            for cell in row:
+                cell.alignment = Alignment(wrap_text=True, vertical="top")
+    return buffer.getvalue()
+
+
+def _measure(build, df: pd.DataFrame, repeat: int) -> tuple[float, int]:
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = len(build(df))
+        best = min(best, time.perf_counter() - started)
+    return best, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Скорость выгрузки SWOT в XLSX")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    df = _frame(args.rows)
+    legacy_time, legacy_size = _measure(legacy_export_swot_xlsx, df, args.repeat)
+    new_time, new_size = _measure(export_swot_xlsx, df, args.repeat)
+    print(f"Строк: {args.rows}")
+    print(f"Прежняя выгрузка:  {legacy_time:.3f} с, {legacy_size} байт")
+    print(f"Write-only книга:  {new_time:.3f} с, {new_size} байт")
+    print(f"Ускорение: x{legacy_time / new_time:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,57 @@
 DEFAULT_MODEL = "tngtech/deepseek-r1t2-chimera:free"
 
+# Порядок важен: при сбое модели запрос переходит к следующей из списка
 MODELS = [
     "tngtech/deepseek-r1t2-chimera:free",
+    "deepseek/deepseek-chat-v3-0324:free",
+    "meta-llama/llama-3.3-70b-instruct:free",
 ]
 
+# Выбор модели с наименьшей медианной задержкой по последним запросам
+AUTO_MODEL = "auto"
+AUTO_MODEL_LABEL = "Авто (самая быстрая)"
+
 MAX_FILE_SIZE_MB = 5
 MAX_CONTEXT_CHARS = 8000
+# Сколько текста вложения читать для поиска релевантных фрагментов;
+# в запрос из него попадает не больше MAX_CONTEXT_CHARS символов
+ATTACHMENT_MAX_CHARS = 500_000
 CHAT_MAX_TOKENS = 4096
 CHAT_MAX_TOKENS_SHORT = 512
+# Сколько токенов истории диалога отправлять целиком; остальное сворачивается в сводку
+CHAT_HISTORY_TOKEN_BUDGET = 6000
+
+# Общий лимит на один API-ключ для всех сессий (free-модели OpenRouter: 20 запросов в минуту)
+API_RATE_PER_MINUTE = 20
+API_BURST = 5
+
+SWOT_MAX_CONCURRENCY = 4
+SWOT_MAX_CONCURRENCY_LIMIT = 8
+SWOT_ROW_MAX_TOKENS = 600
+SWOT_PACK_MAX_TOKENS = 8000
+# Доля строк прогона, для которых разрешён дублирующий запрос
+SWOT_HEDGE_MAX_SHARE = 0.1
+# Порог сходства (Жаккар по символьным шинглам), с которого тезисы считаются одним
+SWOT_DEDUP_THRESHOLD = 0.8
+# Как часто экран прогресса опрашивает фоновую задачу, секунд
+SWOT_POLL_INTERVAL = 1.0
+# Сколько последних готовых строк показывает экран прогресса; вся таблица — после прогона
+SWOT_PROGRESS_ROWS = 20
+# Как часто потоковый ответ обновляет строку «в работе», секунд
+SWOT_PARTIAL_INTERVAL = 0.3
+
+# Нормализованная категория вердикта (колонка «Категория» в результатах SWOT)
+VERDICT_GO = "Продвигать"
+VERDICT_FIX = "Доработать"
+VERDICT_STOP = "Отклонить"
+VERDICT_ERROR = "Ошибка"
+VERDICT_UNKNOWN = "Без вердикта"
+VERDICT_CATEGORIES = [VERDICT_GO, VERDICT_FIX, VERDICT_STOP, VERDICT_ERROR, VERDICT_UNKNOWN]
 
 CONSULTANT_UPLOAD_TYPES = ["txt", "csv", "xlsx", "xls", "docx"]
-SWOT_UPLOAD_TYPES = ["txt", "csv", "xlsx", "xls"]
+SWOT_UPLOAD_TYPES = ["txt", "csv", "xlsx", "xls", "docx"]
+# Сколько тезисов читать из загруженного файла; остальное не разбирается
+SWOT_MAX_THESES = 1000
 
 CHAT_PLACEHOLDER_MESSAGE = "Привет! Принял твою ситуацию, анализирую..."
 
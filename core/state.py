@@ -1,3 +1,5 @@
+import uuid
+
 import streamlit as st
 
 
@@ -10,7 +12,15 @@ def init_session_state() -> None:
         "consultant_short_mode": False,
         "swot_results": None,
         "consultant_file_context": "",
+        "session_id": uuid.uuid4().hex,
     }
     for key, value in defaults.items():
         if key not in st.session_state:
             st.session_state[key] = value
+
+
+def get_session_id(lane: str = "") -> str:
+    # Идентификатор для честной очереди запросов; lane разделяет чат и SWOT
+    # одного участника, чтобы собственный прогон не тормозил его же диалог.
+    session_id = st.session_state["session_id"]
+    return f"{session_id}:{lane}" if lane else session_id
@@ -1,19 +1,574 @@
+import hashlib
+import json
+import random
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from email.utils import parsedate_to_datetime
+from typing import Callable, Iterator, Optional, TypeVar
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from modules.model_router import get_router
+from modules.rate_limiter import CANCEL_POLL_INTERVAL, get_scheduler
+from modules.response_cache import get_response_cache, make_cache_key
 
 OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
 MAX_RETRIES = 3
 INITIAL_DELAY = 1.0
+MAX_DELAY = 20.0
 TIMEOUT = 30
+CONNECT_TIMEOUT = 5
+CHECK_TIMEOUT = 15
+REQUEST_DEADLINE = 90
+POOL_SIZE = 16
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Ответы, по которым виновата модель (недоступна, упала, не ответила), а не запрос
+# или ключ участника: только они идут в статистику сбоев и circuit breaker
+MODEL_FAILURE_STATUSES = (404, 408, 500, 502, 503, 504)
+API_ERROR_PREFIX = "Ошибка API: "
+RATE_LIMIT_MESSAGE = "Превышен лимит запросов. Попробуйте позже."
+TIMEOUT_MESSAGE = "Таймаут запроса"
+INVALID_KEY_MESSAGE = "Неверный API ключ"
+NO_MODEL_MESSAGE = "Все модели временно недоступны. Повторите позже."
+CANCELLED_MESSAGE = "Запрос отменён"
+HEDGE_QUANTILE = 0.9
+HEDGE_POOL_SIZE = 32
+
+T = TypeVar("T")
+
+
+class StreamError(Exception):
+    pass
+
+
+def _retry_after_seconds(response: requests.Response) -> Optional[float]:
+    value = (response.headers.get("Retry-After") or "").strip()
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff_delay(attempt: int) -> float:
+    delay = min(MAX_DELAY, INITIAL_DELAY * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def _error_message(response: requests.Response, limit: int = 300) -> str:
+    if response.status_code == 401:
+        return INVALID_KEY_MESSAGE
+    if response.status_code == 429:
+        return RATE_LIMIT_MESSAGE
+    return f"{API_ERROR_PREFIX}{response.status_code} — {response.text[:limit]}"
+
+
+def _read_content(response: requests.Response) -> tuple[bool, str]:
+    try:
+        data = response.json()
+        content = (
+            data.get("choices", [{}])[0]
+            .get("message", {})
+            .get("content", "")
+        )
+    except (ValueError, IndexError, AttributeError):
+        return False, f"Некорректный ответ API: {response.text[:300]}"
+    return True, (content or "").strip()
+
+
+def _iter_stream_deltas(response: requests.Response) -> Iterator[str]:
+    # text/event-stream приходит без charset, requests иначе декодирует как latin-1
+    response.encoding = "utf-8"
+    for line in response.iter_lines(decode_unicode=True):
+        # Пустые строки разделяют события, строки с ":" — keep-alive комментарии
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            break
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            continue
+        if chunk.get("error"):
+            error = chunk["error"]
+            message = error.get("message") if isinstance(error, dict) else str(error)
+            raise StreamError(f"Ошибка API: {message}")
+        choices = chunk.get("choices") or [{}]
+        delta = (choices[0].get("delta") or {}).get("content")
+        if delta:
+            yield delta
+
+
+def _read_content_cancellable(
+    response: requests.Response, cancel: threading.Event
+) -> Optional[tuple[bool, str]]:
+    # Ответ дубля идёт потоком: заголовки приходят сразу, а генерация — в чтении,
+    # которое победитель обрывает, закрыв сокет (_HedgeAttempt.abort)
+    parts = []
+    try:
+        for delta in _iter_stream_deltas(response):
+            if cancel.is_set():
+                return None
+            parts.append(delta)
+    except StreamError as e:
+        return None if cancel.is_set() else (False, str(e))
+    except requests.exceptions.Timeout:
+        return None if cancel.is_set() else (False, TIMEOUT_MESSAGE)
+    except (requests.exceptions.RequestException, OSError, ValueError) as e:
+        return None if cancel.is_set() else (False, str(e))
+    finally:
+        response.close()
+    if cancel.is_set():
+        return None
+    return True, "".join(parts).strip()
+
+
+class OpenRouterClient:
+    def __init__(
+        self,
+        pool_size: int = POOL_SIZE,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = TIMEOUT,
+        max_retries: int = MAX_RETRIES,
+        deadline: float = REQUEST_DEADLINE,
+    ):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.deadline = deadline
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def post(
+        self,
+        api_key: str,
+        payload: dict,
+        read_timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        deadline: Optional[float] = None,
+        stream: bool = False,
+        session_id: str = "",
+        fail_fast: bool = False,
+        cancel: Optional[threading.Event] = None,
+    ) -> tuple[bool, "requests.Response | str"]:
+        # fail_fast: таймаут или 5xx не повторяются на той же модели (есть запасная),
+        # 429 повторяется как обычно — с паузой всего ключа по Retry-After
+        headers = {
+            "Authorization": f"Bearer {api_key.strip()}",
+            "Content-Type": "application/json",
+        }
+        scheduler = get_scheduler()
+        read_timeout = read_timeout or self.read_timeout
+        attempts = max_retries or self.max_retries
+        stop_at = None
+        last_error = ""
+        for attempt in range(attempts):
+            # Каждая попытка, включая повтор после 429, проходит через общую очередь ключа
+            if scheduler.acquire(api_key, session_id, cancel=cancel) is None:
+                return False, CANCELLED_MESSAGE
+            if cancel is not None and cancel.is_set():
+                return False, CANCELLED_MESSAGE
+            if stop_at is None:
+                stop_at = time.monotonic() + (deadline or self.deadline)
+            remaining = stop_at - time.monotonic()
+            if remaining <= 0:
+                break
+            wait = None
+            rate_limited = False
+            try:
+                r = self.session.post(
+                    OPENROUTER_URL,
+                    headers=headers,
+                    json=payload,
+                    timeout=(self.connect_timeout, min(read_timeout, remaining)),
+                    stream=stream,
+                )
+                if r.status_code == 200:
+                    return True, r
+                last_error = _error_message(r)
+                if r.status_code not in RETRY_STATUSES:
+                    r.close()
+                    return False, last_error
+                wait = _retry_after_seconds(r)
+                rate_limited = r.status_code == 429
+                r.close()
+            except requests.exceptions.Timeout:
+                last_error = TIMEOUT_MESSAGE
+            except requests.exceptions.RequestException as e:
+                last_error = str(e)
+            if attempt == attempts - 1 or (fail_fast and not rate_limited):
+                break
+            if wait is None:
+                wait = _backoff_delay(attempt)
+            if time.monotonic() + wait >= stop_at:
+                break
+            if rate_limited:
+                scheduler.penalize(api_key, wait)
+            elif cancel is not None:
+                cancel.wait(wait)
+            else:
+                time.sleep(wait)
+        return False, last_error or "Не удалось выполнить запрос"
+
+    def complete(
+        self,
+        api_key: str,
+        payload: dict,
+        **kwargs,
+    ) -> tuple[bool, str]:
+        ok, r = self.post(api_key, payload, **kwargs)
+        if not ok:
+            return False, r
+        return _read_content(r)
+
+
+# Одинаковые запросы, пришедшие, пока первый ещё выполняется (из любой сессии),
+# ждут его результат вместо повторного обращения к API.
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[str, Future] = {}
+
+    def do(self, key: str, fn: Callable[[], T]) -> T:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+class _SharedStream:
+    # Один потоковый ответ API на несколько читателей. Фрагменты копятся в списке,
+    # каждый читатель получает их с начала; следующий фрагмент из API забирает
+    # тот читатель, которому он нужен первым. Уход любого читателя, включая
+    # первого, не обрывает поток остальным; источник закрывается, когда ушли все.
+    def __init__(self, open_source: Callable[..., Iterator[str]], on_close: Callable[[], None]):
+        self._on_close = on_close
+        self._cancels: list = []
+        self._parts: list[str] = []
+        self._error: Optional[str] = None
+        self._done = False
+        self._closed = False
+        self._pulling = False
+        self._readers = 0
+        self._cond = threading.Condition()
+        # Источник видит отмену, только когда отменили все читатели
+        self._source = open_source(_ReadersCancel(self))
+
+    def subscribe(self, cancel=None) -> bool:
+        with self._cond:
+            if self._closed:
+                return False
+            self._readers += 1
+            self._cancels.append(cancel)
+            return True
+
+    def all_cancelled(self) -> bool:
+        with self._cond:
+            return all(c is not None and c.is_set() for c in self._cancels)
+
+    def read(self, cancel=None) -> Iterator[str]:
+        i = 0
+        poll = CANCEL_POLL_INTERVAL if cancel is not None else None
+        try:
+            while True:
+                with self._cond:
+                    while i >= len(self._parts) and not self._done and self._pulling:
+                        if cancel is not None and cancel.is_set():
+                            break
+                        self._cond.wait(poll)
+                    if cancel is not None and cancel.is_set():
+                        raise StreamError(CANCELLED_MESSAGE)
+                    if i < len(self._parts):
+                        delta = self._parts[i]
+                        i += 1
+                    elif self._done:
+                        if self._error is not None:
+                            raise StreamError(self._error)
+                        return
+                    else:
+                        self._pulling = True
+                        delta = None
+                if delta is not None:
+                    yield delta
+                else:
+                    self._pull()
+        finally:
+            self._leave(cancel)
+
+    def _pull(self) -> None:
+        error = None
+        done = False
+        try:
+            delta = next(self._source)
+        except StopIteration:
+            done = True
+        except Exception as e:
+            done, error = True, str(e)
+        with self._cond:
+            if done:
+                self._done = True
+                self._error = error
+            else:
+                self._parts.append(delta)
+            self._pulling = False
+            self._cond.notify_all()
+
+    def _leave(self, cancel) -> None:
+        with self._cond:
+            self._readers -= 1
+            self._cancels.remove(cancel)
+            if self._closed or (self._readers > 0 and not self._done):
+                return
+            self._closed = True
+            abandoned = not self._done
+        if abandoned:
+            self._source.close()
+        self._on_close()
+
+
+class _ReadersCancel:
+    # Отмена для источника общего потока в интерфейсе threading.Event
+    def __init__(self, shared: _SharedStream):
+        self._shared = shared
+
+    def is_set(self) -> bool:
+        return self._shared.all_cancelled()
+
+    def wait(self, timeout: float) -> bool:
+        stop_at = time.monotonic() + timeout
+        while not self.is_set():
+            remaining = stop_at - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(remaining, CANCEL_POLL_INTERVAL))
+        return True
+
+
+# То же, что SingleFlight, для потоковых ответов: одинаковый запрос, пришедший,
+# пока первый ещё генерируется, читает тот же поток, а не открывает новый.
+class StreamFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._streams: dict[str, _SharedStream] = {}
+
+    def stream(
+        self,
+        key: str,
+        open_source: Callable[..., Iterator[str]],
+        cancel: Optional[threading.Event] = None,
+    ) -> Iterator[str]:
+        # open_source(cancel) получает отмену, сработавшую у всех читателей
+        with self._lock:
+            shared = self._streams.get(key)
+            if shared is None or not shared.subscribe(cancel):
+                shared = _SharedStream(open_source, lambda: self._forget(key, shared))
+                shared.subscribe(cancel)
+                self._streams[key] = shared
+        return shared.read(cancel)
+
+    def _forget(self, key: str, shared: _SharedStream) -> None:
+        with self._lock:
+            if self._streams.get(key) is shared:
+                del self._streams[key]
+
+
+class _HedgeAttempt:
+    # Общий дескриптор попытки: победитель закрывает ответ проигравшего сам,
+    # не дожидаясь, пока тот дочитает тело, и освобождает соединение пула
+    def __init__(self):
+        self.cancel = threading.Event()
+        self._response: Optional[requests.Response] = None
+        self._lock = threading.Lock()
+
+    def attach(self, response: requests.Response) -> bool:
+        with self._lock:
+            if not self.cancel.is_set():
+                self._response = response
+                return True
+        response.close()
+        return False
+
+    def abort(self) -> None:
+        with self._lock:
+            self.cancel.set()
+            response = self._response
+        if response is None:
+            return
+        # close() не будит поток, заблокированный в чтении сокета; shutdown будит
+        shutdown = getattr(response.raw, "shutdown", None)
+        if shutdown is not None:
+            try:
+                shutdown()
+            except (OSError, ValueError, RuntimeError):
+                pass
+        response.close()
+
+
+class HedgeBudget:
+    # Ограничивает число дублирующих запросов за один прогон
+    def __init__(self, max_extra: int):
+        self.max_extra = max(0, int(max_extra))
+        self.used = 0
+        self._lock = threading.Lock()
 
+    def take(self) -> bool:
+        with self._lock:
+            if self.used >= self.max_extra:
+                return False
+            self.used += 1
+            return True
 
-def check_connection(api_key: str, model: str) -> tuple[bool, str]:
+
+_inflight = SingleFlight()
+_inflight_streams = StreamFlight()
+_hedge_pool = ThreadPoolExecutor(max_workers=HEDGE_POOL_SIZE, thread_name_prefix="hedge")
+_client: Optional[OpenRouterClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> OpenRouterClient:
+    # Один клиент на процесс: пул соединений переживает rerun и общий для всех сессий.
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OpenRouterClient()
+    return _client
+
+
+def _is_model_failure(message: str) -> bool:
+    # Таймауты, обрывы соединения, 5xx и «модель недоступна» — сбой модели.
+    # Неверный ключ, лимит, отмена и прочие 4xx (длинный контекст, нет кредитов
+    # на ключе участника) зависят от запроса: breaker общий для всех сессий,
+    # и чужая ошибка не должна отключать модель остальным
+    if message in (INVALID_KEY_MESSAGE, RATE_LIMIT_MESSAGE, CANCELLED_MESSAGE):
+        return False
+    if message.startswith(API_ERROR_PREFIX):
+        status = message[len(API_ERROR_PREFIX):].split(" ", 1)[0]
+        return status.isdigit() and int(status) in MODEL_FAILURE_STATUSES
+    return True
+
+
+def _post_routed(
+    api_key: str,
+    model: str,
+    payload: dict,
+    session_id: str = "",
+    stream: bool = False,
+    cancel: Optional[threading.Event] = None,
+) -> tuple[bool, "requests.Response | str", str]:
+    # Перебирает модели по маршрутизатору: запрошенная (или самая быстрая для
+    # AUTO_MODEL), затем остальные из MODELS, пропуская модели с открытым breaker.
+    router = get_router()
+    candidates = router.candidates(model)
+    result: tuple[bool, "requests.Response | str", str] = (False, NO_MODEL_MESSAGE, model)
+    for n, candidate in enumerate(candidates):
+        if not router.acquire(candidate):
+            continue
+        has_fallback = n < len(candidates) - 1
+        started = time.monotonic()
+        ok, r = get_client().post(
+            api_key,
+            {**payload, "model": candidate},
+            stream=stream,
+            session_id=session_id,
+            fail_fast=has_fallback,
+            cancel=cancel,
+        )
+        if ok:
+            # Для потока известна только задержка до заголовков: полное время
+            # записывает тот, кто дочитал ответ
+            router.record(candidate, True, None if stream else time.monotonic() - started)
+            return True, r, candidate
+        if not _is_model_failure(r):
+            router.release(candidate)
+            return False, r, candidate
+        router.record(candidate, False)
+        result = (False, r, candidate)
+    return result
+
+
+def _complete_hedged(
+    api_key: str,
+    model: str,
+    payload: dict,
+    hedge: HedgeBudget,
+    session_id: str = "",
+) -> tuple[bool, str]:
+    # Если ответа нет дольше p90 последних запросов к модели, отправляется дубль;
+    # берётся первый успешный ответ, второй запрос обрывается.
+    router = get_router()
+    payload = {**payload, "stream": True}
+    delay = router.latency_percentile(router.candidates(model)[0], HEDGE_QUANTILE)
+
+    def _attempt(attempt: _HedgeAttempt) -> tuple[bool, str]:
+        started = time.monotonic()
+        ok, r, candidate = _post_routed(
+            api_key, model, payload, session_id=session_id, stream=True, cancel=attempt.cancel
+        )
+        if not ok:
+            return False, r
+        if not attempt.attach(r):
+            return False, CANCELLED_MESSAGE
+        result = _read_content_cancellable(r, attempt.cancel)
+        if result is None:
+            return False, CANCELLED_MESSAGE
+        if result[0]:
+            router.add_latency(candidate, time.monotonic() - started)
+        return result
+
+    primary_attempt = _HedgeAttempt()
+    primary = _hedge_pool.submit(_attempt, primary_attempt)
+    if delay is None:
+        return primary.result()
+    done, _ = wait([primary], timeout=delay)
+    if done or not hedge.take():
+        return primary.result()
+    secondary_attempt = _HedgeAttempt()
+    secondary = _hedge_pool.submit(_attempt, secondary_attempt)
+    attempts = {primary: primary_attempt, secondary: secondary_attempt}
+    pending = {primary, secondary}
+    result: tuple[bool, str] = (False, CANCELLED_MESSAGE)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            result = future.result()
+            if result[0]:
+                for other in pending:
+                    attempts[other].abort()
+                    other.cancel()
+                return result
+    return result
+
+
+def check_connection(api_key: str, model: str, session_id: str = "") -> tuple[bool, str]:
     if not api_key or not api_key.strip():
         return False, "Введите API ключ"
-    headers = {
-        "Authorization": f"Bearer {api_key.strip()}",
-        "Content-Type": "application/json",
-    }
     payload = {
         "model": model,
         "messages": [
@@ -22,24 +577,28 @@ def check_connection(api_key: str, model: str) -> tuple[bool, str]:
         "max_tokens": 10,
         "temperature": 0,
     }
-    try:
-        r = requests.post(
-            OPENROUTER_URL,
-            headers=headers,
-            json=payload,
-            timeout=15,
-        )
-        if r.status_code == 401:
-            return False, "Неверный API ключ"
-        if r.status_code == 429:
-            return False, "Превышен лимит запросов. Попробуйте позже."
-        if r.status_code != 200:
-            return False, f"Ошибка API: {r.status_code} — {r.text[:200]}"
+    payload["model"] = get_router().candidates(model)[0]
+    ok, r = get_client().post(
+        api_key,
+        payload,
+        read_timeout=CHECK_TIMEOUT,
+        max_retries=1,
+        deadline=CHECK_TIMEOUT,
+        session_id=session_id,
+    )
+    if ok:
+        r.close()
         return True, "Подключение успешно"
-    except requests.exceptions.Timeout:
+    if r == TIMEOUT_MESSAGE:
         return False, "Таймаут. Проверьте интернет и повторите."
-    except requests.exceptions.RequestException as e:
-        return False, f"Ошибка сети: {str(e)}"
+    if r.startswith("Ошибка API") or r in (INVALID_KEY_MESSAGE, RATE_LIMIT_MESSAGE):
+        return False, r
+    return False, f"Ошибка сети: {r}"
+
+
+def is_rate_limited(result: tuple[bool, str]) -> bool:
+    ok, message = result
+    return not ok and message == RATE_LIMIT_MESSAGE
 
 
 def chat_completion(
@@ -49,108 +608,116 @@ def chat_completion(
     user_message: str,
     temperature: float = 0.7,
     max_tokens: int = 1000,
+    use_cache: bool = True,
+    session_id: str = "",
+    hedge: Optional[HedgeBudget] = None,
 ) -> tuple[bool, str]:
-    headers = {
-        "Authorization": f"Bearer {api_key.strip()}",
-        "Content-Type": "application/json",
-    }
+    return chat_completion_with_history(
+        api_key,
+        model,
+        system_prompt,
+        [{"role": "user", "content": user_message}],
+        temperature=temperature,
+        max_tokens=max_tokens,
+        use_cache=use_cache,
+        session_id=session_id,
+        hedge=hedge,
+    )
+
+
+def chat_completion_with_history(
+    api_key: str,
+    model: str,
+    system_prompt: str,
+    messages: list[dict],
+    temperature: float = 0.7,
+    max_tokens: int = 1000,
+    use_cache: bool = True,
+    session_id: str = "",
+    hedge: Optional[HedgeBudget] = None,
+) -> tuple[bool, str]:
+    cache_key = make_cache_key(model, system_prompt, messages, temperature, max_tokens)
+    if use_cache:
+        cached = get_response_cache().get(cache_key)
+        if cached is not None:
+            return True, cached
     payload = {
         "model": model,
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_message},
-        ],
+        "messages": [{"role": "system", "content": system_prompt}] + messages,
         "temperature": temperature,
         "max_tokens": max_tokens,
     }
-    delay = INITIAL_DELAY
-    last_error = ""
-    for attempt in range(MAX_RETRIES):
-        try:
-            r = requests.post(
-                OPENROUTER_URL,
-                headers=headers,
-                json=payload,
-                timeout=TIMEOUT,
-            )
-            if r.status_code == 401:
-                return False, "Неверный API ключ"
-            if r.status_code == 429:
-                last_error = "Превышен лимит запросов. Попробуйте позже."
-                time.sleep(delay)
-                delay *= 2
-                continue
-            if r.status_code != 200:
-                return False, f"Ошибка API: {r.status_code} — {r.text[:300]}"
-            data = r.json()
-            content = (
-                data.get("choices", [{}])[0]
-                .get("message", {})
-                .get("content", "")
+
+    def _request() -> tuple[bool, str]:
+        if hedge is not None:
+            ok, content = _complete_hedged(
+                api_key, model, payload, hedge, session_id=session_id
             )
-            return True, content.strip()
-        except requests.exceptions.Timeout:
-            last_error = "Таймаут запроса"
-            time.sleep(delay)
-            delay *= 2
-        except requests.exceptions.RequestException as e:
-            last_error = str(e)
-            time.sleep(delay)
-            delay *= 2
-    return False, last_error or "Не удалось выполнить запрос"
+        else:
+            ok, r, _ = _post_routed(api_key, model, payload, session_id=session_id)
+            if not ok:
+                return False, r
+            ok, content = _read_content(r)
+        if ok and use_cache:
+            get_response_cache().put(cache_key, content)
+        return ok, content
 
+    key_digest = hashlib.sha256(api_key.strip().encode("utf-8")).hexdigest()[:16]
+    return _inflight.do(f"{key_digest}:{cache_key}", _request)
 
-def chat_completion_with_history(
+
+def stream_chat_completion_with_history(
     api_key: str,
     model: str,
     system_prompt: str,
     messages: list[dict],
     temperature: float = 0.7,
     max_tokens: int = 1000,
-) -> tuple[bool, str]:
-    headers = {
-        "Authorization": f"Bearer {api_key.strip()}",
-        "Content-Type": "application/json",
-    }
-    full_messages = [{"role": "system", "content": system_prompt}] + messages
+    use_cache: bool = True,
+    session_id: str = "",
+    cancel: Optional[threading.Event] = None,
+) -> Iterator[str]:
+    cache_key = make_cache_key(model, system_prompt, messages, temperature, max_tokens)
+    if use_cache:
+        cached = get_response_cache().get(cache_key)
+        if cached is not None:
+            yield cached
+            return
     payload = {
         "model": model,
-        "messages": full_messages,
+        "messages": [{"role": "system", "content": system_prompt}] + messages,
         "temperature": temperature,
         "max_tokens": max_tokens,
+        "stream": True,
     }
-    delay = INITIAL_DELAY
-    last_error = ""
-    for attempt in range(MAX_RETRIES):
+
+    def _open(source_cancel) -> Iterator[str]:
+        started = time.monotonic()
+        ok, r, candidate = _post_routed(
+            api_key, model, payload, session_id=session_id, stream=True, cancel=source_cancel
+        )
+        if not ok:
+            raise StreamError(r)
+        parts = []
         try:
-            r = requests.post(
-                OPENROUTER_URL,
-                headers=headers,
-                json=payload,
-                timeout=TIMEOUT,
-            )
-            if r.status_code == 401:
-                return False, "Неверный API ключ"
-            if r.status_code == 429:
-                last_error = "Превышен лимит запросов. Попробуйте позже."
-                time.sleep(delay)
-                delay *= 2
-                continue
-            if r.status_code != 200:
-                return False, f"Ошибка API: {r.status_code} — {r.text[:300]}"
-            data = r.json()
-            content = (
-                data.get("choices", [{}])[0]
-                .get("message", {})
-                .get("content", "")
-            )
-            return True, content.strip()
+            for delta in _iter_stream_deltas(r):
+                parts.append(delta)
+                yield delta
         except requests.exceptions.Timeout:
-            last_error = "Таймаут запроса"
-            time.sleep(delay)
-            delay *= 2
+            raise StreamError(TIMEOUT_MESSAGE)
         except requests.exceptions.RequestException as e:
-            last_error = str(e)
-            time.sleep(delay)
-            delay *= 2
-    return False, last_error or "Не удалось выполнить запрос"
+            raise StreamError(str(e))
+        finally:
+            r.close()
+        # Задержка потока — время до последнего фрагмента, как у обычного запроса
+        get_router().add_latency(candidate, time.monotonic() - started)
+        content = "".join(parts).strip()
+        if use_cache and content:
+            get_response_cache().put(cache_key, content)
+
+    key_digest = hashlib.sha256(api_key.strip().encode("utf-8")).hexdigest()[:16]
+    stream = _inflight_streams.stream(f"{key_digest}:{cache_key}", _open, cancel=cancel)
+    try:
+        yield from stream
+    finally:
+        stream.close()
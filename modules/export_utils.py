@@ -1,81 +1,156 @@
 import io
 import re
 from datetime import datetime
+from typing import Optional
+from xml.sax.saxutils import escape as xml_escape
 
 import pandas as pd
-from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
 from openpyxl.utils import get_column_letter
 from docx import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
 
+from core.config import (
+    VERDICT_GO,
+    VERDICT_FIX,
+    VERDICT_STOP,
+    VERDICT_ERROR,
+    VERDICT_UNKNOWN,
+)
 
-def _verdict_color(verdict: str) -> str:
-    v = (verdict or "").strip().upper()
-    if "ПРОДВИГАТЬ" in v:
-        return "C6EFCE"
-    if "ДОРАБОТАТЬ" in v:
-        return "FFEB9C"
-    if "ОТКЛОНИТЬ" in v:
-        return "FFC7CE"
-    return "FFFFFF"
+
+_VERDICT_RE = re.compile(r"продвигать|доработать|отклонить|ошибка", re.IGNORECASE)
+_VERDICT_BY_KEYWORD = {
+    "ПРОДВИГАТЬ": VERDICT_GO,
+    "ДОРАБОТАТЬ": VERDICT_FIX,
+    "ОТКЛОНИТЬ": VERDICT_STOP,
+    "ОШИБКА": VERDICT_ERROR,
+}
+VERDICT_COLORS = {
+    VERDICT_GO: "C6EFCE",
+    VERDICT_FIX: "FFEB9C",
+    VERDICT_STOP: "FFC7CE",
+}
+DEFAULT_VERDICT_COLOR = "FFFFFF"
+
+
+def normalize_verdict(verdict: Optional[str]) -> str:
+    # Категория по первому ключевому слову в тексте вердикта
+    match = _VERDICT_RE.search(verdict) if isinstance(verdict, str) else None
+    if not match:
+        return VERDICT_UNKNOWN
+    return _VERDICT_BY_KEYWORD[match.group(0).upper()]
+
+
+HEADER_COLOR = "1E3A5F"
+XLSX_COLUMN_WIDTH = 20
+
+
+def _find_verdict_column(df: pd.DataFrame):
+    for c in df.columns:
+        if "вердикт" in str(c).lower():
+            return c
+    return None
+
+
+def _verdict_categories(df: pd.DataFrame) -> Optional[pd.Series]:
+    # Категории берутся из колонки, посчитанной при разборе ответа; для таблиц
+    # без неё (старые выгрузки) — один раз из текста вердикта
+    if "Категория" in df.columns:
+        return df["Категория"].astype(str)
+    verdict_col_name = _find_verdict_column(df)
+    if verdict_col_name is None:
+        return None
+    return df[verdict_col_name].map(normalize_verdict)
+
+
+def _summary_rows(df: pd.DataFrame) -> list:
+    rows = [["Всего предложений", len(df)]]
+    categories = _verdict_categories(df)
+    if categories is not None:
+        counts = categories.value_counts()
+        for name in (VERDICT_GO, VERDICT_FIX, VERDICT_STOP):
+            rows.append([name, int(counts.get(name, 0))])
+    return rows
+
+
+def _xlsx_named_styles() -> dict[str, NamedStyle]:
+    # Общие именованные стили вместо отдельных объектов на каждую ячейку
+    header_fill = PatternFill(start_color=HEADER_COLOR, end_color=HEADER_COLOR, fill_type="solid")
+    header_font = Font(bold=True, color="FFFFFF")
+    thin = Side(style="thin")
+    styles = {
+        "summary_header": NamedStyle(name="swot_summary_header", font=header_font, fill=header_fill),
+        "header": NamedStyle(
+            name="swot_header",
+            font=header_font,
+            fill=header_fill,
+            border=Border(left=thin, right=thin, top=thin, bottom=thin),
+            alignment=Alignment(wrap_text=True, vertical="top"),
+        ),
+        "body": NamedStyle(name="swot_body", alignment=Alignment(wrap_text=True, vertical="top")),
+    }
+    for color in [*VERDICT_COLORS.values(), DEFAULT_VERDICT_COLOR]:
+        styles[color] = NamedStyle(
+            name=f"swot_verdict_{color}",
+            fill=PatternFill(start_color=color, end_color=color, fill_type="solid"),
+            alignment=Alignment(wrap_text=True, vertical="top"),
+        )
+    return styles
+
+
+def _xlsx_cell(sheet, value, style: str) -> WriteOnlyCell:
+    cell = WriteOnlyCell(sheet, value=value)
+    cell.style = style
+    return cell
 
 
 def export_swot_xlsx(df: pd.DataFrame) -> bytes:
+    # Write-only книга: строки пишутся потоком за один проход, без хранения
+    # всей сетки ячеек в памяти и без повторных обходов листа.
+    wb = Workbook(write_only=True)
+    styles = _xlsx_named_styles()
+    for style in styles.values():
+        wb.add_named_style(style)
+    summary_data = [["Показатель", "Значение"]] + _summary_rows(df)
+    summary_sheet = wb.create_sheet("Сводка")
+    summary_style = styles["summary_header"].name
+    summary_sheet.append([_xlsx_cell(summary_sheet, v, summary_style) for v in summary_data[0]])
+    for row in summary_data[1:]:
+        summary_sheet.append(row)
+
+    sheet = wb.create_sheet("SWOT-анализ")
+    for col in range(1, len(df.columns) + 1):
+        sheet.column_dimensions[get_column_letter(col)].width = XLSX_COLUMN_WIDTH
+    header_style = styles["header"].name
+    body_style = styles["body"].name
+    sheet.append([_xlsx_cell(sheet, str(name), header_style) for name in df.columns])
+    verdict_col_name = _find_verdict_column(df)
+    verdict_idx = (
+        list(df.columns).index(verdict_col_name) if verdict_col_name is not None else None
+    )
+    if verdict_idx is not None:
+        # Цвет ячейки вердикта — по категории, одним проходом по колонке
+        verdict_styles = (
+            _verdict_categories(df)
+            .map(VERDICT_COLORS)
+            .fillna(DEFAULT_VERDICT_COLOR)
+            .map(lambda color: styles[color].name)
+            .tolist()
+        )
+    for row_idx, values in enumerate(df.itertuples(index=False, name=None)):
+        cells = []
+        for i, value in enumerate(values):
+            if not isinstance(value, str) and pd.isna(value):
+                value = None
+            style = verdict_styles[row_idx] if i == verdict_idx else body_style
+            cells.append(_xlsx_cell(sheet, value, style))
+        sheet.append(cells)
     buffer = io.BytesIO()
-    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
-        total = len(df)
-        verdict_col_name = None
-        for c in df.columns:
-            if "вердикт" in str(c).lower():
-                verdict_col_name = c
-                break
-        if verdict_col_name:
-            v_series = df[verdict_col_name].fillna("").astype(str).str.upper()
-            go_count = int((v_series.str.contains("ПРОДВИГАТЬ")).sum())
-            fix_count = int((v_series.str.contains("ДОРАБОТАТЬ")).sum())
-            stop_count = int((v_series.str.contains("ОТКЛОНИТЬ")).sum())
-            summary_data = [
-                ["Показатель", "Значение"],
-                ["Всего предложений", total],
-                ["Продвигать", go_count],
-                ["Доработать", fix_count],
-                ["Отклонить", stop_count],
-            ]
-        else:
-            summary_data = [["Показатель", "Значение"], ["Всего предложений", total]]
-        pd.DataFrame(summary_data).to_excel(writer, sheet_name="Сводка", index=False, header=False)
-        summary_sheet = writer.sheets["Сводка"]
-        for col in range(1, summary_sheet.max_column + 1):
-            summary_sheet.cell(1, col).font = Font(bold=True, color="FFFFFF")
-            summary_sheet.cell(1, col).fill = PatternFill(start_color="1E3A5F", end_color="1E3A5F", fill_type="solid")
-        df.to_excel(writer, sheet_name="SWOT-анализ", index=False)
-        sheet = writer.sheets["SWOT-анализ"]
-        header_fill = PatternFill(start_color="1E3A5F", end_color="1E3A5F", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF")
-        for col in range(1, sheet.max_column + 1):
-            cell = sheet.cell(1, col)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal="center", wrap_text=True)
-        verdict_col = None
-        for c, name in enumerate(df.columns, start=1):
-            if "вердикт" in str(name).lower():
-                verdict_col = c
-                break
-        if verdict_col:
-            for row in range(2, sheet.max_row + 1):
-                cell = sheet.cell(row, verdict_col)
-                fill = PatternFill(
-                    start_color=_verdict_color(cell.value or ""),
-                    end_color=_verdict_color(cell.value or ""),
-                    fill_type="solid",
-                )
-                cell.fill = fill
-        for col in range(1, sheet.max_column + 1):
-            sheet.column_dimensions[get_column_letter(col)].width = 20
-        for row in sheet.iter_rows(min_row=1, max_row=sheet.max_row, min_col=1, max_col=sheet.max_column):
-            for cell in row:
-                cell.alignment = Alignment(wrap_text=True, vertical="top")
-    buffer.seek(0)
+    wb.save(buffer)
     return buffer.getvalue()
 
 
@@ -92,61 +167,86 @@ def export_swot_md(df: pd.DataFrame) -> str:
     return "\n".join(lines)
 
 
+# Символы, недопустимые в XML документа Word
+_XML_ILLEGAL_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_DOCX_BREAK_RE = re.compile(r"\r\n|\r|\n")
+_DOCX_BREAK = '</w:t><w:br/><w:t xml:space="preserve">'
+_DOCX_TAB = '</w:t><w:tab/><w:t xml:space="preserve">'
+
+
+def _docx_cell_xml(value, tc_pr: str) -> str:
+    # Переносы строк и табуляции — как у cell.text в python-docx
+    if not isinstance(value, str) and pd.isna(value):
+        value = ""
+    text = xml_escape(_XML_ILLEGAL_RE.sub("", str(value)))
+    text = _DOCX_BREAK_RE.sub(_DOCX_BREAK, text).replace("\t", _DOCX_TAB)
+    return f'<w:tc>{tc_pr}<w:p><w:r><w:t xml:space="preserve">{text}</w:t></w:r></w:p></w:tc>'
+
+
+def _docx_body_rows(df: pd.DataFrame, col_widths: list) -> list:
+    # Строки таблицы собираются одной XML-строкой и разбираются за один вызов:
+    # без обращений к table.rows[i].cells, стоимость которых растёт с размером таблицы
+    tc_prs = [
+        f'<w:tcPr><w:tcW w:w="{w.twips}" w:type="dxa"/></w:tcPr>' if w is not None else ""
+        for w in col_widths
+    ]
+    parts = [f"<w:tbl {nsdecls('w')}>"]
+    for values in df.itertuples(index=False, name=None):
+        parts.append("<w:tr>")
+        parts.extend(_docx_cell_xml(v, tc_prs[i]) for i, v in enumerate(values))
+        parts.append("</w:tr>")
+    parts.append("</w:tbl>")
+    return list(parse_xml("".join(parts)))
+
+
 def export_swot_docx(df: pd.DataFrame) -> bytes:
     doc = Document()
     doc.add_heading("Отчёт по SWOT-анализу предложений", 0)
     doc.add_paragraph(f"Дата выгрузки: {datetime.now().strftime('%d.%m.%Y %H:%M')}")
     doc.add_paragraph("")
     doc.add_heading("Сводка", level=1)
-    total = len(df)
-    verdict_col_name = None
-    for c in df.columns:
-        if "вердикт" in str(c).lower():
-            verdict_col_name = c
-            break
-    if verdict_col_name:
-        v_series = df[verdict_col_name].fillna("").astype(str).str.upper()
-        go_count = (v_series.str.contains("ПРОДВИГАТЬ")).sum()
-        fix_count = (v_series.str.contains("ДОРАБОТАТЬ")).sum()
-        stop_count = (v_series.str.contains("ОТКЛОНИТЬ")).sum()
-        doc.add_paragraph(f"Всего предложений: {total}.")
-        doc.add_paragraph(f"Продвигать: {go_count}. Доработать: {fix_count}. Отклонить: {stop_count}.")
-    else:
-        doc.add_paragraph(f"Всего предложений: {total}.")
+    summary = _summary_rows(df)
+    doc.add_paragraph(f"Всего предложений: {summary[0][1]}.")
+    if len(summary) > 1:
+        doc.add_paragraph(". ".join(f"{name}: {count}" for name, count in summary[1:]) + ".")
     doc.add_paragraph("")
     doc.add_heading("Детальный анализ", level=1)
-    table = doc.add_table(rows=1 + len(df), cols=len(df.columns))
+    # Шапка — через python-docx, тело таблицы — пакетной вставкой XML
+    table = doc.add_table(rows=1, cols=len(df.columns))
     table.style = "Table Grid"
     hdr = table.rows[0].cells
     for i, col_name in enumerate(df.columns):
         hdr[i].text = str(col_name)
         for p in hdr[i].paragraphs:
             p.runs[0].bold = True
-    for row_idx, (_, r) in enumerate(df.iterrows(), start=1):
-        row_cells = table.rows[row_idx].cells
-        for col_idx, val in enumerate(r):
-            row_cells[col_idx].text = str(val) if pd.notna(val) else ""
+    table._tbl.extend(_docx_body_rows(df, [cell.width for cell in hdr]))
     buffer = io.BytesIO()
     doc.save(buffer)
     buffer.seek(0)
     return buffer.getvalue()
 
 
+def _chat_message_txt(m: dict) -> str:
+    role = "Вы" if m.get("role") == "user" else "Аналитик"
+    return f"{role}:\n{m.get('content', '')}\n"
+
+
+def _chat_md_header() -> list[str]:
+    return ["# Экспорт диалога\n", f"*{datetime.now().strftime('%d.%m.%Y %H:%M')}*\n"]
+
+
+def _chat_message_md(m: dict) -> str:
+    role = "**Вы**" if m.get("role") == "user" else "**Аналитик**"
+    content = (m.get("content") or "").replace("\n", "\n\n")
+    return f"{role}\n\n{content}\n\n---\n"
+
+
 def export_chat_txt(messages: list) -> str:
-    lines = []
-    for m in messages:
-        role = "Вы" if m.get("role") == "user" else "Аналитик"
-        lines.append(f"{role}:\n{m.get('content', '')}\n")
-    return "\n".join(lines)
+    return "\n".join(_chat_message_txt(m) for m in messages)
 
 
 def export_chat_md(messages: list) -> str:
-    lines = ["# Экспорт диалога\n", f"*{datetime.now().strftime('%d.%m.%Y %H:%M')}*\n"]
-    for m in messages:
-        role = "**Вы**" if m.get("role") == "user" else "**Аналитик**"
-        content = (m.get("content") or "").replace("\n", "\n\n")
-        lines.append(f"{role}\n\n{content}\n\n---\n")
-    return "\n".join(lines)
+    return "\n".join(_chat_md_header() + [_chat_message_md(m) for m in messages])
 
 
 def export_chat_docx(messages: list) -> bytes:
@@ -165,47 +265,216 @@ def export_chat_docx(messages: list) -> bytes:
     return buffer.getvalue()
 
 
+# Экспорт диалога, который дописывается по мере добавления сообщений:
+# TXT и MD собираются из уже отформатированных частей, результат кэшируется
+# на версию диалога, DOCX строится только по запросу.
+class ChatExporter:
+    def __init__(self):
+        self._keys: list[tuple] = []
+        self._txt: list[str] = []
+        self._md: list[str] = []
+        self._outputs: dict[str, tuple] = {}
+        self._version = 0
+
+    def _sync(self, messages: list) -> int:
+        # Общий префикс сравнивается по ссылкам на строки из session_state,
+        # поэтому проверка неизменённых сообщений почти бесплатна.
+        keep = 0
+        for key, m in zip(self._keys, messages):
+            if key != (m.get("role"), m.get("content")):
+                break
+            keep += 1
+        if keep == len(self._keys) == len(messages):
+            return self._version
+        del self._keys[keep:], self._txt[keep:], self._md[keep:]
+        for m in messages[keep:]:
+            self._keys.append((m.get("role"), m.get("content")))
+            self._txt.append(_chat_message_txt(m))
+            self._md.append(_chat_message_md(m))
+        self._version += 1
+        return self._version
+
+    def _cached(self, fmt: str, version: int, build):
+        cached = self._outputs.get(fmt)
+        if cached is None or cached[0] != version:
+            cached = (version, build())
+            self._outputs[fmt] = cached
+        return cached[1]
+
+    def txt(self, messages: list) -> str:
+        version = self._sync(messages)
+        return self._cached("txt", version, lambda: "\n".join(self._txt))
+
+    def md(self, messages: list) -> str:
+        version = self._sync(messages)
+        return self._cached("md", version, lambda: "\n".join(_chat_md_header() + self._md))
+
+    def docx(self, messages: list) -> bytes:
+        version = self._sync(messages)
+        return self._cached("docx", version, lambda: export_chat_docx(messages))
+
+    def docx_ready(self, messages: list) -> Optional[bytes]:
+        version = self._sync(messages)
+        cached = self._outputs.get("docx")
+        return cached[1] if cached and cached[0] == version else None
+
+
+_MARKDOWN_RES = tuple(
+    re.compile(pattern)
+    for pattern in (r"\*\*([^*]+)\*\*", r"\*([^*]+)\*", r"__([^_]+)__", r"_([^_]+)_")
+)
+
+
 def _strip_markdown(s: str) -> str:
     if not s:
         return ""
-    s = re.sub(r"\*\*([^*]+)\*\*", r"\1", s)
-    s = re.sub(r"\*([^*]+)\*", r"\1", s)
-    s = re.sub(r"__([^_]+)__", r"\1", s)
-    s = re.sub(r"_([^_]+)_", r"\1", s)
+    if "*" in s or "_" in s:
+        for pattern in _MARKDOWN_RES:
+            s = pattern.sub(r"\1", s)
     return s.strip()
 
 
+_SWOT_FIELDS = {
+    "ТЕЗИС": "Тезис",
+    "ЭФФЕКТ": "Эффект",
+    "РИСКИ": "Риски",
+    "ВЕРДИКТ": "Вердикт",
+}
+# Строка поля: метка в начале строки, допускаются маркеры списка, заголовка
+# и жирный шрифт вокруг метки («**ВЕРДИКТ:**», «- Эффект:», «### РИСКИ**:»)
+_FIELD_LINE_RE = re.compile(
+    r"^[ \t*_#>\-]*(ТЕЗИС|ЭФФЕКТ|РИСКИ|ВЕРДИКТ)[ \t]*[*_]*[ \t]*:(.*)$",
+    re.IGNORECASE | re.MULTILINE,
+)
+_VERDICT_FALLBACK_RE = re.compile(
+    r"(Продвигать|Доработать|Отклонить)[\s\-—:]*([^\n]*)", re.IGNORECASE
+)
+_THESIS_NUMBER_RE = re.compile(r"^\s*\[?\s*(\d+)\s*\]?\s*[.):\-—]?\s*")
+_BLOCK_NUMBER_RE = re.compile(
+    r"^\s*\**\s*ТЕЗИС\s*(?:№\s*)?\[?\s*(\d+)", re.IGNORECASE | re.MULTILINE
+)
+
+
+def _field_value(raw: str) -> str:
+    return _strip_markdown(raw.strip()).strip("* ")
+
+
+def _iter_swot_fields(text: str):
+    # Один проход по тексту: пары (поле, значение) в порядке появления
+    for match in _FIELD_LINE_RE.finditer(text):
+        yield _SWOT_FIELDS[match.group(1).upper()], _field_value(match.group(2))
+
+
+def _parse_swot_block(block: str) -> dict:
+    return dict(_iter_swot_fields(block))
+
+
+class SwotStreamParser:
+    # Разбор ответа по мере поступления: feed принимает очередной кусок потока
+    # и возвращает текущее состояние строки, включая недописанное поле;
+    # finalize — итоговую строку, как parse_swot_response для всего текста.
+    def __init__(self, thesis: str):
+        self.thesis = thesis[:500]
+        self._fields: dict = {}
+        self._parts: list[str] = []
+        self._tail = ""
+
+    def _row(self, fields: dict) -> dict:
+        thesis = fields.get("Тезис")
+        if thesis is None:
+            thesis = self.thesis
+        elif not thesis:
+            thesis = _strip_markdown(self.thesis)
+        verdict = fields.get("Вердикт", "")
+        return {
+            "Тезис": thesis,
+            "Эффект": fields.get("Эффект", ""),
+            "Риски": fields.get("Риски", ""),
+            "Вердикт": verdict,
+            "Категория": normalize_verdict(verdict),
+            "Статус": "Готово",
+        }
+
+    def feed(self, chunk: str) -> dict:
+        if chunk:
+            self._parts.append(chunk)
+            text = self._tail + chunk
+            end = text.rfind("\n")
+            if end >= 0:
+                self._fields.update(_iter_swot_fields(text[:end]))
+                text = text[end + 1:]
+            self._tail = text
+        fields = self._fields
+        if self._tail:
+            fields = {**fields, **dict(_iter_swot_fields(self._tail))}
+        row = self._row(fields)
+        row["Статус"] = "Генерируется"
+        return row
+
+    def finalize(self) -> dict:
+        if self._tail:
+            self._fields.update(_iter_swot_fields(self._tail))
+            self._tail = ""
+        row = self._row(self._fields)
+        if not row["Вердикт"]:
+            text = "".join(self._parts)
+            verdict_match = _VERDICT_FALLBACK_RE.search(text) if text.strip() else None
+            if verdict_match:
+                row["Вердикт"] = _strip_markdown(
+                    f"{verdict_match.group(1)} - {verdict_match.group(2).strip()}"
+                )
+                row["Категория"] = normalize_verdict(row["Вердикт"])
+        return row
+
+
 def parse_swot_response(thesis: str, raw_response: str) -> dict:
-    result = {
-        "Тезис": thesis[:500],
-        "Эффект": "",
-        "Риски": "",
-        "Вердикт": "",
-        "Статус": "Готово",
-    }
-    text = (raw_response or "").strip()
-    for block in text.split("---"):
+    parser = SwotStreamParser(thesis)
+    parser.feed(raw_response or "")
+    return parser.finalize()
+
+
+def _block_number(block: str, fields: dict) -> Optional[int]:
+    match = _BLOCK_NUMBER_RE.search(block)
+    if match:
+        return int(match.group(1))
+    match = _THESIS_NUMBER_RE.match(fields.get("Тезис", ""))
+    if match and fields.get("Тезис"):
+        return int(match.group(1))
+    return None
+
+
+def parse_swot_batch_response(theses: list[str], raw_response: str) -> list[Optional[dict]]:
+    # Ответ на пакет из нескольких пронумерованных тезисов. Блоки сопоставляются
+    # с тезисами по номеру, без номеров — по порядку, если число блоков совпало.
+    # Для тезисов без корректного блока возвращается None.
+    blocks = []
+    for block in (raw_response or "").split("---"):
         block = block.strip()
         if not block:
             continue
-        for line in block.split("\n"):
-            line = line.strip()
-            if line.upper().startswith("ТЕЗИС:"):
-                result["Тезис"] = _strip_markdown(line[6:].strip() or thesis[:500])
-            elif line.upper().startswith("ЭФФЕКТ:"):
-                result["Эффект"] = _strip_markdown(line[7:].strip())
-            elif line.upper().startswith("РИСКИ:"):
-                result["Риски"] = _strip_markdown(line[6:].strip())
-            elif line.upper().startswith("ВЕРДИКТ:"):
-                result["Вердикт"] = _strip_markdown(line[8:].strip())
-    if not result["Вердикт"] and text:
-        verdict_match = re.search(
-            r"(Продвигать|Доработать|Отклонить)[\s\-—:]*([^\n]*)",
-            text,
-            re.IGNORECASE,
-        )
-        if verdict_match:
-            result["Вердикт"] = _strip_markdown(
-                f"{verdict_match.group(1)} - {verdict_match.group(2).strip()}"
-            )
-    return result
+        fields = _parse_swot_block(block)
+        if not fields.get("Вердикт"):
+            continue
+        blocks.append((_block_number(block, fields), fields))
+    results: list[Optional[dict]] = [None] * len(theses)
+    numbered = [b for b in blocks if b[0] is not None]
+    if numbered and len(numbered) == len(blocks):
+        seen = {}
+        for number, fields in numbered:
+            if 1 <= number <= len(theses):
+                seen.setdefault(number, []).append(fields)
+        pairs = [(n - 1, f[0]) for n, f in seen.items() if len(f) == 1]
+    elif len(blocks) == len(theses):
+        pairs = [(i, fields) for i, (_, fields) in enumerate(blocks)]
+    else:
+        pairs = []
+    for i, fields in pairs:
+        results[i] = {
+            "Тезис": theses[i][:500],
+            "Эффект": fields.get("Эффект", ""),
+            "Риски": fields.get("Риски", ""),
+            "Вердикт": fields.get("Вердикт", ""),
+            "Категория": normalize_verdict(fields.get("Вердикт")),
+            "Статус": "Готово",
+        }
+    return results
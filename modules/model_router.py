@@ -0,0 +1,154 @@
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from core.config import AUTO_MODEL, MODELS
+
+ROUTER_WINDOW = 50
+BREAKER_CONSECUTIVE_FAILURES = 3
+BREAKER_MIN_SAMPLES = 6
+BREAKER_ERROR_RATE = 0.5
+BREAKER_COOLDOWN = 60.0
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+def _percentile(values: list[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class ModelStats:
+    def __init__(self, window: int = ROUTER_WINDOW):
+        self.latencies: deque = deque(maxlen=window)
+        self.outcomes: deque = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.state = STATE_CLOSED
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    def p50(self) -> Optional[float]:
+        return _percentile(list(self.latencies), 0.5)
+
+    def p90(self) -> Optional[float]:
+        return _percentile(list(self.latencies), 0.9)
+
+
+# Скользящая статистика задержек и ошибок по каждой модели и circuit breaker:
+# после серии сбоев модель исключается на BREAKER_COOLDOWN секунд, затем
+# пропускается один пробный запрос (half-open).
+class ModelRouter:
+    def __init__(self, models: Optional[list[str]] = None):
+        self.models = list(models or MODELS)
+        self._lock = threading.Lock()
+        self._stats: dict[str, ModelStats] = {}
+
+    def _get(self, model: str) -> ModelStats:
+        stats = self._stats.get(model)
+        if stats is None:
+            stats = self._stats[model] = ModelStats()
+        return stats
+
+    def candidates(self, model: str) -> list[str]:
+        with self._lock:
+            if model == AUTO_MODEL:
+                unknown = [m for m in self.models if self._get(m).p50() is None]
+                known = sorted(
+                    (m for m in self.models if self._get(m).p50() is not None),
+                    key=lambda m: self._get(m).p50(),
+                )
+                ordered = unknown + known
+            else:
+                ordered = [model] + [m for m in self.models if m != model]
+            available = [m for m in ordered if self._available(m)]
+            # Если все модели «открыты», всё равно пробуем запрошенную
+            return available or ordered[:1]
+
+    def _available(self, model: str) -> bool:
+        stats = self._get(model)
+        if stats.state == STATE_CLOSED:
+            return True
+        if stats.state == STATE_OPEN and time.monotonic() - stats.opened_at >= BREAKER_COOLDOWN:
+            stats.state = STATE_HALF_OPEN
+        return stats.state == STATE_HALF_OPEN and not stats.probe_in_flight
+
+    def acquire(self, model: str) -> bool:
+        with self._lock:
+            if not self._available(model):
+                return False
+            stats = self._get(model)
+            if stats.state == STATE_HALF_OPEN:
+                stats.probe_in_flight = True
+            return True
+
+    def release(self, model: str) -> None:
+        with self._lock:
+            self._get(model).probe_in_flight = False
+
+    def record(self, model: str, ok: bool, latency: Optional[float] = None) -> None:
+        with self._lock:
+            stats = self._get(model)
+            stats.probe_in_flight = False
+            stats.outcomes.append(ok)
+            if ok:
+                if latency is not None:
+                    stats.latencies.append(latency)
+                stats.consecutive_failures = 0
+                stats.state = STATE_CLOSED
+                return
+            stats.consecutive_failures += 1
+            too_many_errors = (
+                len(stats.outcomes) >= BREAKER_MIN_SAMPLES
+                and stats.error_rate() >= BREAKER_ERROR_RATE
+            )
+            if (
+                stats.state == STATE_HALF_OPEN
+                or stats.consecutive_failures >= BREAKER_CONSECUTIVE_FAILURES
+                or too_many_errors
+            ):
+                stats.state = STATE_OPEN
+                stats.opened_at = time.monotonic()
+
+    def add_latency(self, model: str, latency: float) -> None:
+        with self._lock:
+            self._get(model).latencies.append(latency)
+
+    def latency_percentile(self, model: str, q: float) -> Optional[float]:
+        with self._lock:
+            return _percentile(list(self._get(model).latencies), q)
+
+    def stats(self) -> dict[str, dict]:
+        with self._lock:
+            return {
+                m: {
+                    "state": self._get(m).state,
+                    "p50": self._get(m).p50(),
+                    "p90": self._get(m).p90(),
+                    "error_rate": self._get(m).error_rate(),
+                }
+                for m in self.models
+            }
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> ModelRouter:
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = ModelRouter()
+    return _router
@@ -60,6 +60,10 @@ SWOT_SYSTEM_DETAILED = """Ты - детальный стратег-аналит
 ВЕРДИКТ: [Продвигать/Доработать/Отклонить] - [...]
 ---"""
 
+SWOT_BATCH_INSTRUCTION = """Ниже пронумерованный список тезисов. Оцени каждый тезис отдельно в указанном формате, блоки разделяй строкой ---.
+В строке ТЕЗИС обязательно укажи номер тезиса в квадратных скобках, например: ТЕЗИС: [3] текст тезиса.
+Не пропускай и не объединяй тезисы."""
+
 SWOT_TEMPLATES = {
     "Стандартный (краткий)": SWOT_SYSTEM_DEFAULT,
     "Строгий (минимум текста)": SWOT_SYSTEM_STRICT,
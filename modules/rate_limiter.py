@@ -0,0 +1,131 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+
+from core.config import API_BURST, API_RATE_PER_MINUTE
+
+WAIT_STATS_WINDOW = 50
+# Как часто ждущий в очереди запрос проверяет отмену, секунд
+CANCEL_POLL_INTERVAL = 0.5
+
+
+class _KeyQueue:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        # Порядок ключей — порядок обслуживания сессий (round-robin)
+        self.sessions: "OrderedDict[str, deque]" = OrderedDict()
+
+    def refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def depth(self) -> int:
+        return sum(len(q) for q in self.sessions.values())
+
+
+def _bounded(timeout: float, limit: Optional[float]) -> float:
+    return timeout if limit is None else min(timeout, limit)
+
+
+# Token bucket на каждый API-ключ и честная очередь по сессиям перед ним:
+# токены выдаются сессиям по кругу, поэтому длинный SWOT-прогон одного
+# участника не задерживает чат остальных больше, чем на один запрос.
+class FairScheduler:
+    def __init__(
+        self,
+        rate_per_minute: float = API_RATE_PER_MINUTE,
+        burst: float = API_BURST,
+    ):
+        self.rate = rate_per_minute / 60.0
+        self.burst = max(1.0, float(burst))
+        self._cond = threading.Condition()
+        self._queues: dict[str, _KeyQueue] = {}
+        self._waits: deque = deque(maxlen=WAIT_STATS_WINDOW)
+
+    def _queue(self, api_key: str) -> _KeyQueue:
+        key = hashlib.sha256(api_key.strip().encode("utf-8")).hexdigest()
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = _KeyQueue(self.rate, self.burst)
+        return queue
+
+    def acquire(self, api_key: str, session_id: str = "", cancel=None) -> Optional[float]:
+        # cancel — объект с is_set(): отменённый запрос уходит из очереди без
+        # токена (возвращается None), не занимая место остальных сессий
+        ticket = object()
+        poll = CANCEL_POLL_INTERVAL if cancel is not None else None
+        granted = False
+        started = time.monotonic()
+        with self._cond:
+            queue = self._queue(api_key)
+            queue.sessions.setdefault(session_id, deque()).append(ticket)
+            try:
+                while True:
+                    if cancel is not None and cancel.is_set():
+                        return None
+                    now = time.monotonic()
+                    queue.refill(now)
+                    head_tickets = next(iter(queue.sessions.values()))
+                    if head_tickets[0] is not ticket:
+                        self._cond.wait(poll)
+                        continue
+                    if now < queue.blocked_until:
+                        self._cond.wait(_bounded(queue.blocked_until - now, poll))
+                        continue
+                    if queue.tokens < 1:
+                        self._cond.wait(_bounded((1 - queue.tokens) / self.rate, poll))
+                        continue
+                    queue.tokens -= 1
+                    granted = True
+                    break
+            finally:
+                tickets = queue.sessions[session_id]
+                tickets.remove(ticket)
+                if not tickets:
+                    del queue.sessions[session_id]
+                elif granted:
+                    # Обслуженная сессия уходит в конец круга
+                    queue.sessions.move_to_end(session_id)
+                self._cond.notify_all()
+            waited = time.monotonic() - started
+            self._waits.append(waited)
+            return waited
+
+    def penalize(self, api_key: str, seconds: float) -> None:
+        # После 429 пауза общая для всех сессий с этим ключом
+        with self._cond:
+            queue = self._queue(api_key)
+            queue.blocked_until = max(queue.blocked_until, time.monotonic() + seconds)
+            queue.tokens = min(queue.tokens, 0.0)
+            queue.updated = max(queue.updated, queue.blocked_until)
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            depth = sum(q.depth() for q in self._queues.values())
+            waits = list(self._waits)
+        return {
+            "queued": depth,
+            "avg_wait": sum(waits) / len(waits) if waits else 0.0,
+            "max_wait": max(waits) if waits else 0.0,
+        }
+
+
+_scheduler: Optional[FairScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> FairScheduler:
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = FairScheduler()
+    return _scheduler
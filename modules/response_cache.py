@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Optional
+
+CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    ".cache",
+    "responses.sqlite3",
+)
+CACHE_MAX_ENTRIES = 5000
+CACHE_MAX_BYTES = 50 * 1024 * 1024
+CACHE_TTL = 7 * 24 * 3600
+
+
+def _normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFC", text or "")
+    return " ".join(text.split())
+
+
+def make_cache_key(
+    model: str,
+    system_prompt: str,
+    messages: list[dict],
+    temperature: float,
+    max_tokens: int,
+) -> str:
+    normalized = [
+        [m.get("role", ""), _normalize_text(m.get("content", ""))] for m in messages
+    ]
+    raw = json.dumps(
+        [model, system_prompt, normalized, round(float(temperature), 3), int(max_tokens)],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        path: str = CACHE_PATH,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        max_bytes: int = CACHE_MAX_BYTES,
+        ttl: float = CACHE_TTL,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        try:
+            if path != ":memory:":
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)"
+            )
+            self._conn = conn
+        except (OSError, sqlite3.Error):
+            # Без диска кэш просто выключается, запросы идут напрямую в API
+            self._conn = None
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = None
+            if self._conn is not None:
+                now = time.time()
+                try:
+                    row = self._conn.execute(
+                        "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row and now - row[1] <= self.ttl:
+                        value = row[0]
+                        self._conn.execute(
+                            "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+                        )
+                    elif row:
+                        self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                except sqlite3.Error:
+                    value = None
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def put(self, key: str, value: str) -> None:
+        if self._conn is None or not value:
+            return
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, value, size, now, now),
+                )
+                self._evict(now)
+            except sqlite3.Error:
+                pass
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # Удаляем давно не использованные записи, пока не уложимся в оба лимита
+        removed = 0
+        removed_bytes = 0
+        stale = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at ASC"
+        ):
+            if count - removed <= self.max_entries and total - removed_bytes <= self.max_bytes:
+                break
+            stale.append((key,))
+            removed += 1
+            removed_bytes += size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+    def stats(self) -> dict:
+        entries = 0
+        if self._conn is not None:
+            with self._lock:
+                try:
+                    entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+                except sqlite3.Error:
+                    entries = 0
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
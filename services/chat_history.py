@@ -0,0 +1,96 @@
+import hashlib
+from typing import List, Optional, Tuple
+
+from services.tokens import estimate_tokens
+
+ATTACHMENT_PREFIX = "Контекст из прикреплённого файла:\n\n"
+ATTACHMENT_SEPARATOR = "\n\n---\nВопрос/ситуация:\n"
+HISTORY_TOKEN_BUDGET = 6000
+SUMMARY_TOKEN_BUDGET = 800
+SUMMARY_LINE_CHARS = 240
+SUMMARY_HEADER = "Краткое содержание более ранней части диалога:"
+
+
+def build_user_message(question: str, context: str = "") -> str:
+    if not context:
+        return question
+    return f"{ATTACHMENT_PREFIX}{context}{ATTACHMENT_SEPARATOR}{question}"
+
+
+def strip_attachment(content: str) -> str:
+    if content.startswith(ATTACHMENT_PREFIX) and ATTACHMENT_SEPARATOR in content:
+        question = content.split(ATTACHMENT_SEPARATOR, 1)[1]
+        return f"[к сообщению был приложен файл]\n{question}"
+    return content
+
+
+def _summary_line(message: dict) -> str:
+    role = "Пользователь" if message.get("role") == "user" else "Аналитик"
+    text = " ".join(strip_attachment(message.get("content") or "").split())
+    if len(text) > SUMMARY_LINE_CHARS:
+        text = text[:SUMMARY_LINE_CHARS].rstrip() + "…"
+    return f"- {role}: {text}"
+
+
+def _digest(message: dict) -> str:
+    raw = f"{message.get('role', '')}\n{message.get('content') or ''}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _rolling_summary(messages: List[dict], upto: int, cache: dict) -> str:
+    # cache хранит строки сводки для первых cache["upto"] сообщений; при росте
+    # диалога досчитываются только новые строки.
+    lines = cache.get("lines", [])
+    done = cache.get("upto", 0)
+    if done > upto or (done and cache.get("digest") != _digest(messages[done - 1])):
+        lines, done = [], 0
+    lines = lines + [_summary_line(m) for m in messages[done:upto]]
+    cache["lines"] = lines
+    cache["upto"] = upto
+    cache["digest"] = _digest(messages[upto - 1]) if upto else ""
+    kept = []
+    used = estimate_tokens(SUMMARY_HEADER)
+    for line in reversed(lines):
+        cost = estimate_tokens(line)
+        if kept and used + cost > SUMMARY_TOKEN_BUDGET:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join([SUMMARY_HEADER] + list(reversed(kept)))
+
+
+def compact_history(
+    messages: List[dict],
+    token_budget: int = HISTORY_TOKEN_BUDGET,
+    cache: Optional[dict] = None,
+) -> Tuple[str, List[dict]]:
+    # Последние сообщения идут как есть, пока укладываются в бюджет; вложение,
+    # которое уже не влезает, заменяется пометкой, остальное сворачивается в сводку.
+    # Возвращает (сводку для системного промта, сообщения для API).
+    if cache is None:
+        cache = {}
+    if not messages:
+        return "", []
+    kept: List[dict] = []
+    used = 0
+    start = len(messages)
+    for i in range(len(messages) - 1, -1, -1):
+        message = messages[i]
+        content = message.get("content") or ""
+        cost = estimate_tokens(content)
+        if kept and used + cost > token_budget:
+            content = strip_attachment(content)
+            cost = estimate_tokens(content)
+        if kept and used + cost > token_budget:
+            break
+        kept.append({"role": message.get("role", "user"), "content": content})
+        used += cost
+        start = i
+    kept.reverse()
+    # Окно должно начинаться с реплики пользователя
+    while len(kept) > 1 and kept[0]["role"] != "user":
+        kept.pop(0)
+        start += 1
+    if start == 0:
+        return "", kept
+    return _rolling_summary(messages, start, cache), kept
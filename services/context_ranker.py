@@ -0,0 +1,130 @@
+import hashlib
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from services.lru_cache import BoundedLRU
+
+PASSAGE_CHARS = 600
+STEM_LENGTH = 5
+BM25_K1 = 1.5
+BM25_B = 0.75
+INDEX_CACHE_MAX_ITEMS = 32
+INDEX_CACHE_MAX_BYTES = 64 * 1024 * 1024
+GAP_MARKER = "\n[…]\n"
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _terms(text: str) -> List[str]:
+    # Грубая нормализация для русского: нижний регистр и обрезка до первых
+    # STEM_LENGTH символов, чтобы «выручка» и «выручки» совпадали
+    return [t[:STEM_LENGTH] for t in _TOKEN_RE.findall(text.lower()) if len(t) > 1]
+
+
+def split_passages(text: str, passage_chars: int = PASSAGE_CHARS) -> List[str]:
+    # Фрагменты собираются из целых строк; слишком длинная строка режется по длине
+    passages: List[str] = []
+    current: List[str] = []
+    size = 0
+    for line in text.split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+        while len(line) > passage_chars:
+            cut = line.rfind(" ", 0, passage_chars)
+            cut = cut if cut > passage_chars // 2 else passage_chars
+            pieces, line = line[:cut], line[cut:].strip()
+            if current:
+                passages.append("\n".join(current))
+                current, size = [], 0
+            passages.append(pieces)
+        if current and size + len(line) + 1 > passage_chars:
+            passages.append("\n".join(current))
+            current, size = [], 0
+        if line:
+            current.append(line)
+            size += len(line) + 1
+    if current:
+        passages.append("\n".join(current))
+    return passages
+
+
+# Индекс BM25 по фрагментам одного вложения
+class PassageIndex:
+    def __init__(self, text: str, passage_chars: int = PASSAGE_CHARS):
+        self.passages = split_passages(text, passage_chars)
+        self.size_bytes = len(text.encode("utf-8")) * 3
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._lengths: List[int] = []
+        for i, passage in enumerate(self.passages):
+            counts = Counter(_terms(passage))
+            self._lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self._postings.setdefault(term, []).append((i, tf))
+        self._avg_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+
+    def scores(self, query: str) -> Dict[int, float]:
+        n = len(self.passages)
+        scores: Dict[int, float] = {}
+        for term in set(_terms(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for i, tf in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[i] / self._avg_length)
+                scores[i] = scores.get(i, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return scores
+
+
+_indexes = BoundedLRU(
+    max_items=INDEX_CACHE_MAX_ITEMS,
+    max_bytes=INDEX_CACHE_MAX_BYTES,
+    sizeof=lambda index: index.size_bytes,
+)
+
+
+def get_passage_index(text: str) -> PassageIndex:
+    # Индекс строится один раз на содержимое вложения и общий для всех сессий
+    key = (hashlib.sha256(text.encode("utf-8")).hexdigest(), PASSAGE_CHARS)
+    return _indexes.get_or_create(key, lambda: PassageIndex(text))
+
+
+def select_context(text: str, query: str, max_chars: int) -> str:
+    # Вложение, которое влезает в бюджет, идёт целиком. Иначе берутся самые
+    # релевантные вопросу фрагменты в порядке документа; если вопрос ни с чем
+    # не совпал — начало документа, как раньше.
+    if not text or len(text) <= max_chars:
+        return text or ""
+    index = get_passage_index(text)
+    if not index.passages:
+        # Во вложении одни пробельные строки — передавать нечего
+        return ""
+    scores = index.scores(query or "")
+    ranked = bool(scores)
+    order = sorted(scores, key=lambda i: (-scores[i], i)) if ranked else range(len(index.passages))
+    chosen: List[int] = []
+    used = 0
+    for i in order:
+        cost = len(index.passages[i]) + len(GAP_MARKER)
+        if used + cost > max_chars:
+            if ranked:
+                continue
+            break
+        chosen.append(i)
+        used += cost
+    if not chosen:
+        # Даже один фрагмент не влез в бюджет — берётся начало лучшего
+        return index.passages[order[0]][:max_chars]
+    parts: List[str] = []
+    previous = None
+    for i in sorted(chosen):
+        if previous is not None:
+            parts.append("\n" if i == previous + 1 else GAP_MARKER)
+        elif i > 0:
+            parts.append(GAP_MARKER.lstrip("\n"))
+        parts.append(index.passages[i])
+        previous = i
+    return "".join(parts)[:max_chars]
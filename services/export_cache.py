@@ -0,0 +1,30 @@
+import hashlib
+from typing import Callable, Union
+
+import pandas as pd
+
+from services.lru_cache import BoundedLRU
+
+EXPORT_CACHE_MAX_ITEMS = 64
+EXPORT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+ExportData = Union[bytes, str]
+
+_exports = BoundedLRU(max_items=EXPORT_CACHE_MAX_ITEMS, max_bytes=EXPORT_CACHE_MAX_BYTES)
+
+
+def frame_digest(df: pd.DataFrame) -> str:
+    digest = hashlib.sha256()
+    digest.update("\x1f".join(map(str, df.columns)).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def cached_export(
+    df: pd.DataFrame,
+    fmt: str,
+    build: Callable[[pd.DataFrame], ExportData],
+) -> ExportData:
+    # Файл выгрузки собирается один раз на каждое уникальное содержимое таблицы
+    # и формат; кэш общий для всех сессий и вытесняет давно не нужные файлы.
+    return _exports.get_or_create((frame_digest(df), fmt), lambda: build(df))
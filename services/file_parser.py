@@ -1,8 +1,30 @@
+import csv
+import hashlib
 import io
-from typing import List, Optional
+import os
+import zipfile
+from contextlib import closing
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+from xml.etree import ElementTree
 
 import pandas as pd
 
+from services.lru_cache import BoundedLRU
+
+MAX_THESES = 1000
+CELL_SEPARATOR = " | "
+PARSE_CACHE_MAX_ITEMS = 256
+PARSE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_P = _W + "p"
+_W_T = _W + "t"
+_W_TR = _W + "tr"
+_W_TC = _W + "tc"
+_W_INLINE = {_W + "tab": "\t", _W + "br": "\n", _W + "cr": "\n"}
+_RELS_TAG = "{http://schemas.openxmlformats.org/package/2006/relationships}Relationship"
+
 
 def parse_theses_from_text(text: Optional[str]) -> List[str]:
     if not text or not text.strip():
@@ -10,45 +32,205 @@ def parse_theses_from_text(text: Optional[str]) -> List[str]:
     return [line.strip() for line in text.strip().split("\n") if line.strip()]
 
 
-def parse_theses_from_upload(uploaded_file) -> List[str]:
+def _parsed_size(value) -> int:
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    return sum(len(item.encode("utf-8")) for item in value)
+
+
+# Результаты разбора загрузок по хэшу содержимого и параметрам разбора:
+# файл разбирается один раз на уникальное содержимое, кэш общий для всех сессий
+_parsed = BoundedLRU(
+    max_items=PARSE_CACHE_MAX_ITEMS, max_bytes=PARSE_CACHE_MAX_BYTES, sizeof=_parsed_size
+)
+
+
+def _extension(name: str) -> str:
+    return os.path.splitext(name)[1]
+
+
+def _cached_parse(raw: bytes, options: tuple, parse: Callable[[], Any]) -> Any:
+    return _parsed.get_or_create((hashlib.sha256(raw).hexdigest(), *options), parse)
+
+
+def _text_stream(raw: bytes, encoding: str = "utf-8") -> io.TextIOWrapper:
+    return io.TextIOWrapper(io.BytesIO(raw), encoding=encoding, errors="replace", newline="")
+
+
+def _iter_csv_rows(raw: bytes) -> Iterator[list]:
+    # csv читает файл построчно, без DataFrame на весь файл
+    yield from csv.reader(_text_stream(raw, "utf-8-sig"))
+
+
+def _iter_xlsx_rows(raw: bytes, max_col: Optional[int] = None) -> Iterator[tuple]:
+    # read_only: строки первого листа отдаются по одной, лист целиком не грузится
+    from openpyxl import load_workbook
+
+    wb = load_workbook(io.BytesIO(raw), read_only=True, data_only=True)
+    try:
+        sheet = wb.worksheets[0]
+        # Размер из <dimension> в файле не проверяется, и сторонние генераторы
+        # пишут его неверно (например, A1) — иначе строки за ним были бы потеряны
+        sheet.reset_dimensions()
+        yield from sheet.iter_rows(max_col=max_col, values_only=True)
+    finally:
+        wb.close()
+
+
+def _iter_xls_rows(raw: bytes, max_col: Optional[int] = None) -> Iterator[tuple]:
+    # Старый .xls openpyxl не читает — остаётся pandas, но только нужные колонки
+    usecols = list(range(max_col)) if max_col else None
+    df = pd.read_excel(io.BytesIO(raw), header=None, usecols=usecols)
+    for values in df.itertuples(index=False, name=None):
+        yield tuple(None if pd.isna(v) else v for v in values)
+
+
+def _iter_table_rows(name: str, raw: bytes, max_col: Optional[int] = None) -> Iterator[tuple]:
+    if name.endswith(".csv"):
+        for row in _iter_csv_rows(raw):
+            yield tuple(row[:max_col] if max_col else row)
+    elif name.endswith(".xlsx"):
+        yield from _iter_xlsx_rows(raw, max_col)
+    else:
+        yield from _iter_xls_rows(raw, max_col)
+
+
+def _docx_main_part(archive: zipfile.ZipFile) -> str:
+    # Основная часть документа указана в _rels/.rels; почти всегда это word/document.xml
+    try:
+        with archive.open("_rels/.rels") as f:
+            for _, elem in ElementTree.iterparse(f):
+                if elem.tag == _RELS_TAG and elem.get("Type", "").endswith("/officeDocument"):
+                    return elem.get("Target", "").lstrip("/")
+    except KeyError:
+        pass
+    return "word/document.xml"
+
+
+def _iter_docx_blocks(raw: bytes) -> Iterator[Tuple[str, object]]:
+    # Потоковый разбор document.xml без объектной модели python-docx.
+    # Блоки в порядке документа: ("p", текст абзаца) или ("row", ячейки строки таблицы).
+    # Вложенная таблица попадает текстом в ячейку внешней.
+    with zipfile.ZipFile(io.BytesIO(raw)) as archive:
+        with archive.open(_docx_main_part(archive)) as f:
+            cells: List[List[str]] = []
+            rows: List[List[str]] = []
+            for event, elem in ElementTree.iterparse(f, events=("start", "end")):
+                tag = elem.tag
+                if event == "start":
+                    if tag == _W_TR:
+                        rows.append([])
+                    elif tag == _W_TC:
+                        cells.append([])
+                    continue
+                if tag == _W_P:
+                    text = "".join(
+                        node.text or "" if node.tag == _W_T else _W_INLINE[node.tag]
+                        for node in elem.iter()
+                        if node.tag == _W_T or node.tag in _W_INLINE
+                    ).strip()
+                    elem.clear()
+                    if cells:
+                        if text:
+                            cells[-1].append(text)
+                    elif text:
+                        yield "p", text
+                elif tag == _W_TC:
+                    rows[-1].append(" ".join(cells.pop()))
+                    elem.clear()
+                elif tag == _W_TR:
+                    row = rows.pop()
+                    elem.clear()
+                    if cells:
+                        cells[-1].append(CELL_SEPARATOR.join(c for c in row if c))
+                    elif any(row):
+                        yield "row", row
+
+
+def _first_column_theses(rows: Iterable[tuple], max_theses: int) -> List[str]:
+    values = (str(row[0]).strip() for row in rows if row and row[0] is not None)
+    return list(islice((v for v in values if v), max_theses))
+
+
+def _docx_theses(raw: bytes, max_theses: int) -> List[str]:
+    # Тезис — непустой абзац или первая ячейка строки таблицы
+    with closing(_iter_docx_blocks(raw)) as blocks:
+        values = (value if kind == "p" else value[0] for kind, value in blocks)
+        return list(islice((v for v in values if v), max_theses))
+
+
+def _docx_text(raw: bytes, max_chars: int) -> str:
+    with closing(_iter_docx_blocks(raw)) as blocks:
+        return _rows_to_text(
+            ((value,) if kind == "p" else tuple(value) for kind, value in blocks), max_chars
+        )
+
+
+def _parse_theses(name: str, raw: bytes, max_theses: int) -> List[str]:
+    # Чтение останавливается на max_theses тезисе: время и память зависят
+    # от того, что нужно, а не от размера файла
+    if name.endswith(".docx"):
+        return _docx_theses(raw, max_theses)
+    if name.endswith(".txt"):
+        lines = (line.strip() for line in _text_stream(raw))
+        return list(islice((line for line in lines if line), max_theses))
+    if name.endswith((".csv", ".xlsx", ".xls")):
+        with closing(_iter_table_rows(name, raw, max_col=1)) as rows:
+            return _first_column_theses(rows, max_theses)
+    return []
+
+
+def parse_theses_from_upload(uploaded_file, max_theses: int = MAX_THESES) -> List[str]:
     name = (uploaded_file.name or "").lower()
     try:
         raw = uploaded_file.read()
-        if name.endswith(".txt"):
-            return parse_theses_from_text(raw.decode("utf-8", errors="replace"))
-        if name.endswith(".csv"):
-            df = pd.read_csv(io.BytesIO(raw), encoding="utf-8-sig", header=None)
-            if len(df.columns) > 0:
-                return [str(x).strip() for x in df.iloc[:, 0].dropna() if str(x).strip()]
-            return []
-        if name.endswith(".xlsx") or name.endswith(".xls"):
-            df = pd.read_excel(io.BytesIO(raw), header=None)
-            if len(df.columns) > 0:
-                return [str(x).strip() for x in df.iloc[:, 0].dropna() if str(x).strip()]
-            return []
+        theses = _cached_parse(
+            raw, ("theses", _extension(name), max_theses),
+            lambda: _parse_theses(name, raw, max_theses),
+        )
+        return list(theses)
     except Exception:
         pass
     return []
 
 
+def _rows_to_text(rows: Iterable[tuple], max_chars: int) -> str:
+    parts = []
+    used = 0
+    for row in rows:
+        cells = ["" if v is None else str(v).strip() for v in row]
+        while cells and not cells[-1]:
+            cells.pop()
+        if not cells:
+            continue
+        line = CELL_SEPARATOR.join(cells)
+        parts.append(line)
+        used += len(line) + 1
+        if used >= max_chars:
+            break
+    return "\n".join(parts)[:max_chars]
+
+
+def _read_text(name: str, raw: bytes, max_chars: int) -> str:
+    if name.endswith(".txt"):
+        # В UTF-8 символ занимает не больше 4 байт — декодируется только нужное начало
+        return raw[:max_chars * 4].decode("utf-8", errors="replace")[:max_chars]
+    if name.endswith((".csv", ".xlsx", ".xls")):
+        with closing(_iter_table_rows(name, raw)) as rows:
+            return _rows_to_text(rows, max_chars)
+    if name.endswith(".docx"):
+        return _docx_text(raw, max_chars)
+    return ""
+
+
 def read_uploaded_file_as_text(uploaded_file, max_chars: int = 8000) -> str:
     name = (uploaded_file.name or "").lower()
     try:
         raw = uploaded_file.read()
-        if name.endswith(".txt"):
-            out = raw.decode("utf-8", errors="replace")
-            return out[:max_chars] if len(out) > max_chars else out
-        if name.endswith(".csv"):
-            df = pd.read_csv(io.BytesIO(raw), encoding="utf-8-sig")
-            return df.to_string()[:max_chars]
-        if name.endswith(".xlsx") or name.endswith(".xls"):
-            df = pd.read_excel(io.BytesIO(raw))
-            return df.to_string()[:max_chars]
-        if name.endswith(".docx"):
-            from docx import Document
-            doc = Document(io.BytesIO(raw))
-            out = "\n".join(p.text for p in doc.paragraphs)
-            return out[:max_chars] if len(out) > max_chars else out
+        return _cached_parse(
+            raw, ("text", _extension(name), max_chars),
+            lambda: _read_text(name, raw, max_chars),
+        )
     except Exception:
         pass
     return ""
@@ -0,0 +1,33 @@
+import threading
+from typing import Dict, List, Sequence
+
+import pandas as pd
+
+RESULT_COLUMNS = ["№", "Тезис", "Эффект", "Риски", "Вердикт", "Категория", "Кластер", "Статус"]
+
+
+# Колоночный буфер результатов: строка добавляется за O(числа колонок).
+# Экран прогресса берёт только хвост из последних строк, поэтому стоимость
+# опроса и объём, уходящий в браузер, не растут с длиной прогона; полная
+# таблица собирается один раз, когда прогон закончен.
+class ResultsBuffer:
+    def __init__(self, columns: Sequence[str] = RESULT_COLUMNS):
+        self.columns = list(columns)
+        self._data: Dict[str, List] = {c: [] for c in self.columns}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data[self.columns[0]])
+
+    def append(self, row: dict) -> None:
+        with self._lock:
+            for c in self.columns:
+                self._data[c].append(row.get(c, ""))
+
+    def tail(self, count: int) -> pd.DataFrame:
+        # Последние count строк, самые свежие сверху
+        with self._lock:
+            return pd.DataFrame(
+                {c: values[-count:][::-1] for c, values in self._data.items()},
+                columns=self.columns,
+            )
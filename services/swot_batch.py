@@ -0,0 +1,135 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from services.tokens import estimate_tokens
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+DEFAULT_MAX_WORKERS = 4
+RATE_LIMIT_COOLDOWN = 2.0
+RATE_LIMIT_COOLDOWN_MAX = 30.0
+RATE_LIMIT_ATTEMPTS = 3
+PACK_TOKEN_BUDGET = 4000
+PACK_TOKENS_PER_ROW = 300
+PACK_MAX_ITEMS = 10
+# Как часто run_batch проверяет stop, пока ждёт результатов, секунд
+STOP_POLL_INTERVAL = 0.5
+# Результат задачи, пропущенной после stop
+_STOPPED = object()
+
+
+# Ограничивает число одновременных запросов: при 429 лимит делится пополам
+# и включается пауза, после серии успешных ответов лимит растёт на единицу.
+class AdaptiveLimiter:
+    def __init__(self, max_limit: int, min_limit: int = 1):
+        self.max_limit = max(1, int(max_limit))
+        self.min_limit = max(1, min(int(min_limit), self.max_limit))
+        self.limit = self.max_limit
+        self._active = 0
+        self._successes = 0
+        self._cooldown = RATE_LIMIT_COOLDOWN
+        self._resume_at = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while True:
+                wait_for = self._resume_at - time.monotonic()
+                if wait_for > 0:
+                    self._cond.wait(wait_for)
+                    continue
+                if self._active < self.limit:
+                    self._active += 1
+                    return
+                self._cond.wait()
+
+    def release(self, rate_limited: bool = False) -> None:
+        with self._cond:
+            self._active -= 1
+            if rate_limited:
+                self.limit = max(self.min_limit, self.limit // 2)
+                self._successes = 0
+                self._resume_at = time.monotonic() + self._cooldown
+                self._cooldown = min(self._cooldown * 2, RATE_LIMIT_COOLDOWN_MAX)
+            else:
+                self._successes += 1
+                self._cooldown = RATE_LIMIT_COOLDOWN
+                if self.limit < self.max_limit and self._successes >= self.limit:
+                    self.limit += 1
+                    self._successes = 0
+            self._cond.notify_all()
+
+
+def run_batch(
+    items: Sequence[T],
+    worker: Callable[[T], R],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    is_rate_limited: Optional[Callable[[R], bool]] = None,
+    stop: Optional[threading.Event] = None,
+) -> Iterator[Tuple[int, R]]:
+    # Пары (индекс, результат) отдаются по мере готовности, индекс позволяет
+    # вызывающему коду сохранить исходный порядок. После stop новые задачи
+    # не запускаются, а генератор завершается, не дожидаясь уже запущенных.
+    if not items or (stop is not None and stop.is_set()):
+        return
+    limiter = AdaptiveLimiter(max_workers)
+
+    def _task(item: T) -> R:
+        result = None
+        for _ in range(RATE_LIMIT_ATTEMPTS):
+            limiter.acquire()
+            if stop is not None and stop.is_set():
+                limiter.release()
+                return _STOPPED
+            limited = False
+            try:
+                result = worker(item)
+                limited = bool(is_rate_limited and is_rate_limited(result))
+            finally:
+                limiter.release(rate_limited=limited)
+            if not limited:
+                break
+        return result
+
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, min(max_workers, len(items))),
+        thread_name_prefix="swot-batch",
+    )
+    try:
+        futures = {executor.submit(_task, item): i for i, item in enumerate(items)}
+        pending = set(futures)
+        poll = STOP_POLL_INTERVAL if stop is not None else None
+        while pending:
+            done, pending = wait(pending, timeout=poll, return_when=FIRST_COMPLETED)
+            if stop is not None and stop.is_set():
+                return
+            for future in done:
+                yield futures[future], future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def pack_theses(
+    theses: Sequence[str],
+    token_budget: int = PACK_TOKEN_BUDGET,
+    tokens_per_row: int = PACK_TOKENS_PER_ROW,
+    max_items: int = PACK_MAX_ITEMS,
+) -> List[List[int]]:
+    # Группирует индексы тезисов подряд так, чтобы текст тезисов плюс ожидаемый
+    # ответ на каждый укладывались в бюджет токенов одного запроса.
+    batches: List[List[int]] = []
+    current: List[int] = []
+    used = 0
+    for i, thesis in enumerate(theses):
+        cost = estimate_tokens(thesis) + tokens_per_row
+        if current and (used + cost > token_budget or len(current) >= max_items):
+            batches.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
@@ -0,0 +1,193 @@
+import hmac
+import secrets
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from services.results_buffer import ResultsBuffer
+
+# Одновременных прогонов — с запасом на всех участников сессии: темп запросов
+# ограничивает FairScheduler ключа, а не этот пул; задачи сверх него ждут в очереди
+JOB_WORKERS = 32
+JOB_TTL = 6 * 3600
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_CANCELLED = "cancelled"
+JOB_FAILED = "failed"
+
+# Функция прогона получает задачу и индексы тезисов, которые ещё не готовы,
+# и отдаёт пары (индекс, строка результата) по мере готовности.
+RunFn = Callable[["SwotJob", List[int]], Iterator[Tuple[int, dict]]]
+
+
+class SwotJob:
+    def __init__(self, owner: str, total: int, params: dict):
+        self.id = uuid.uuid4().hex[:12]
+        self.owner = owner
+        # Токен владельца: id задачи виден в адресе страницы, поэтому открыть,
+        # остановить или продолжить задачу можно только с этим токеном
+        self.token = secrets.token_urlsafe(16)
+        self.total = total
+        self.params = params
+        self.rows: List[Optional[dict]] = [None] * total
+        self._done = 0
+        # Строки в порядке готовности — для дозаписи в таблицу прогресса
+        self.buffer = ResultsBuffer()
+        # Строки, которые ещё генерируются (потоковый ответ), по индексу тезиса
+        self._partial: dict[int, dict] = {}
+        self.status = JOB_QUEUED
+        self.error = ""
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.queued_at = self.created_at
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def done_count(self) -> int:
+        return self._done
+
+    @property
+    def active(self) -> bool:
+        return self.status in (JOB_QUEUED, JOB_RUNNING)
+
+    def owned_by(self, token: Optional[str]) -> bool:
+        return bool(token) and hmac.compare_digest(token, self.token)
+
+    def pending_indices(self) -> List[int]:
+        with self._lock:
+            return [i for i, r in enumerate(self.rows) if r is None]
+
+    def set_partial(self, index: int, row: dict) -> None:
+        with self._lock:
+            if self.rows[index] is None:
+                self._partial[index] = row
+
+    def partial_rows(self) -> List[dict]:
+        with self._lock:
+            return [{"№": i + 1, **row} for i, row in sorted(self._partial.items())]
+
+    def clear_partial(self) -> None:
+        with self._lock:
+            self._partial.clear()
+
+    def set_row(self, index: int, row: dict) -> None:
+        with self._lock:
+            if self.rows[index] is None:
+                self._done += 1
+            self.rows[index] = row
+            self._partial.pop(index, None)
+            self.updated_at = time.time()
+        self.buffer.append({"№": index + 1, **row})
+
+    def results(self) -> List[dict]:
+        # «№» — номер тезиса во входном списке: на него ссылается колонка «Кластер»,
+        # и он остаётся верным в выгрузках после фильтра, сортировки и остановки
+        with self._lock:
+            return [{"№": i + 1, **r} for i, r in enumerate(self.rows) if r is not None]
+
+
+# Пул фоновых задач на уровне процесса: прогон не зависит от rerun скрипта
+# и переживает отключение участника; готовые строки хранятся в задаче.
+class JobManager:
+    def __init__(self, workers: int = JOB_WORKERS, ttl: float = JOB_TTL):
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="swot-job")
+        self._jobs: dict[str, SwotJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, owner: str, total: int, params: dict, run_fn: RunFn) -> SwotJob:
+        job = SwotJob(owner, total, params)
+        with self._lock:
+            self._cleanup()
+            self._jobs[job.id] = job
+        self._start(job, run_fn)
+        return job
+
+    def get(self, job_id: Optional[str], token: Optional[str]) -> Optional[SwotJob]:
+        if not job_id:
+            return None
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job if job is not None and job.owned_by(token) else None
+
+    def cancel(self, job_id: str, token: Optional[str]) -> None:
+        job = self.get(job_id, token)
+        if job and job.active:
+            job.cancel_event.set()
+
+    def resume(self, job_id: str, token: Optional[str], run_fn: RunFn) -> Optional[SwotJob]:
+        # Повторно обрабатываются только строки, которых ещё нет
+        job = self.get(job_id, token)
+        if job is None or job.active:
+            return job
+        job.cancel_event = threading.Event()
+        job.error = ""
+        self._start(job, run_fn)
+        return job
+
+    def queue_position(self, job: SwotJob) -> int:
+        # Сколько задач в очереди пула стоит перед этой (0 — она следующая)
+        with self._lock:
+            return sum(
+                1
+                for other in self._jobs.values()
+                if other is not job and other.status == JOB_QUEUED
+                and other.queued_at < job.queued_at
+            )
+
+    def _start(self, job: SwotJob, run_fn: RunFn) -> None:
+        job.status = JOB_QUEUED
+        job.queued_at = time.time()
+        self._executor.submit(self._run, job, run_fn)
+
+    def _run(self, job: SwotJob, run_fn: RunFn) -> None:
+        job.status = JOB_RUNNING
+        pending = job.pending_indices()
+        rows = run_fn(job, pending)
+        try:
+            for index, row in rows:
+                job.set_row(index, row)
+                if job.cancel_event.is_set():
+                    break
+        except Exception as e:
+            job.error = str(e)
+            job.status = JOB_FAILED
+            return
+        finally:
+            close = getattr(rows, "close", None)
+            if close:
+                close()
+            job.clear_partial()
+            job.updated_at = time.time()
+        if job.cancel_event.is_set() and job.pending_indices():
+            job.status = JOB_CANCELLED
+        else:
+            job.status = JOB_DONE
+
+    def _cleanup(self) -> None:
+        now = time.time()
+        stale = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if not job.active and now - job.updated_at > self.ttl
+        ]
+        for job_id in stale:
+            del self._jobs[job_id]
+
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = JobManager()
+    return _manager
@@ -1,30 +1,50 @@
+import hashlib
 import re
-from typing import Optional
+from typing import Optional, Sequence
 
 import pandas as pd
 
+from core.config import VERDICT_GO, VERDICT_FIX, VERDICT_STOP, VERDICT_ERROR
+from services.lru_cache import BoundedLRU
+
+
+RESULTS_PAGE_SIZE = 25
+ROW_CACHE_MAX_ITEMS = 5000
+ROW_CACHE_MAX_BYTES = 16 * 1024 * 1024
+SEARCH_COLUMNS = ("Тезис", "Эффект", "Риски", "Вердикт")
+
+_MARKDOWN_RES = tuple(
+    re.compile(pattern)
+    for pattern in (r"\*\*([^*]+)\*\*", r"\*([^*]+)\*", r"__([^_]+)__", r"_([^_]+)_")
+)
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+# Готовые <tr> по содержимому строки: при смене страницы, сортировки или
+# фильтра заново собираются только строки, которых ещё не было на экране
+_row_fragments = BoundedLRU(max_items=ROW_CACHE_MAX_ITEMS, max_bytes=ROW_CACHE_MAX_BYTES)
+
 
 def strip_markdown_for_display(text: str) -> str:
     if not text:
         return ""
     s = str(text).strip()
-    s = re.sub(r"\*\*([^*]+)\*\*", r"\1", s)
-    s = re.sub(r"\*([^*]+)\*", r"\1", s)
-    s = re.sub(r"__([^_]+)__", r"\1", s)
-    s = re.sub(r"_([^_]+)_", r"\1", s)
-    s = re.sub(r"\n{3,}", "\n\n", s)
+    if "*" in s or "_" in s:
+        for pattern in _MARKDOWN_RES:
+            s = pattern.sub(r"\1", s)
+    s = _BLANK_LINES_RE.sub("\n\n", s)
     return s.strip()
 
 
-def verdict_badge_class(verdict: Optional[str]) -> str:
-    v = (verdict or "").strip().upper()
-    if "ПРОДВИГАТЬ" in v:
-        return "badge-success"
-    if "ДОРАБОТАТЬ" in v:
-        return "badge-warning"
-    if "ОТКЛОНИТЬ" in v or "ОШИБКА" in v:
-        return "badge-danger"
-    return ""
+VERDICT_BADGES = {
+    VERDICT_GO: "badge-success",
+    VERDICT_FIX: "badge-warning",
+    VERDICT_STOP: "badge-danger",
+    VERDICT_ERROR: "badge-danger",
+}
+
+
+def verdict_badge_class(category: Optional[str]) -> str:
+    return VERDICT_BADGES.get(category or "", "")
 
 
 def escape_html(value) -> str:
@@ -37,34 +57,89 @@ def escape_html(value) -> str:
     )
 
 
+def filter_results(
+    df: pd.DataFrame,
+    categories: Optional[Sequence[str]] = None,
+    query: str = "",
+) -> pd.DataFrame:
+    # Фильтр по категории вердикта и подстроке в тексте строки, без учёта регистра
+    if categories and "Категория" in df.columns:
+        df = df[df["Категория"].isin(categories)]
+    query = (query or "").strip()
+    if query and len(df):
+        mask = pd.Series(False, index=df.index)
+        for column in SEARCH_COLUMNS:
+            if column in df.columns:
+                mask |= df[column].astype(str).str.contains(query, case=False, regex=False)
+        df = df[mask]
+    return df
+
+
+def sort_results(df: pd.DataFrame, by: Optional[str] = None, descending: bool = False) -> pd.DataFrame:
+    # Без колонки — исходный порядок (по номеру тезиса)
+    if not by or by not in df.columns:
+        return df.sort_index(ascending=not descending)
+    return df.sort_values(by, ascending=not descending, kind="stable")
+
+
+def page_count(total: int, page_size: int = RESULTS_PAGE_SIZE) -> int:
+    return max(1, -(-total // page_size))
+
+
+def results_page(df: pd.DataFrame, page: int, page_size: int = RESULTS_PAGE_SIZE) -> pd.DataFrame:
+    # page — с единицы; номер за пределами диапазона прижимается к краю
+    page = min(max(1, page), page_count(len(df), page_size))
+    start = (page - 1) * page_size
+    return df.iloc[start:start + page_size]
+
+
+def _row_html(number: int, thesis, effect, risks, verdict, category, cluster) -> str:
+    badge = VERDICT_BADGES.get(str(category), "")
+    verdict = escape_html(strip_markdown_for_display(verdict))
+    verdict_cell = f'<span class="{badge}">{verdict}</span>' if badge else verdict
+    return (
+        f"<tr>"
+        f"<td class=\"col-num\">{number}</td>"
+        f"<td class=\"col-text\">{escape_html(strip_markdown_for_display(thesis))}</td>"
+        f"<td class=\"col-text\">{escape_html(strip_markdown_for_display(effect))}</td>"
+        f"<td class=\"col-text\">{escape_html(strip_markdown_for_display(risks))}</td>"
+        f"<td class=\"col-verdict\">{verdict_cell}</td>"
+        f"<td class=\"col-num\">{escape_html(cluster)}</td>"
+        f"</tr>"
+    )
+
+
+def _cached_row_html(*fields) -> str:
+    key = hashlib.sha1("\x1f".join(map(str, fields)).encode("utf-8")).hexdigest()
+    return _row_fragments.get_or_create(key, lambda: _row_html(*fields))
+
+
 def build_results_table_html(df: pd.DataFrame) -> str:
-    rows_html = []
-    for idx, r in df.iterrows():
-        thesis = strip_markdown_for_display(r.get("Тезис", ""))
-        effect = strip_markdown_for_display(r.get("Эффект", ""))
-        risks = strip_markdown_for_display(r.get("Риски", ""))
-        verdict = strip_markdown_for_display(r.get("Вердикт", ""))
-        badge = verdict_badge_class(verdict)
-        verdict_cell = (
-            f'<span class="{badge}">{escape_html(verdict)}</span>'
-            if badge
-            else escape_html(verdict)
-        )
-        rows_html.append(
-            f"<tr>"
-            f"<td class=\"col-num\">{idx + 1}</td>"
-            f"<td class=\"col-text\">{escape_html(thesis)}</td>"
-            f"<td class=\"col-text\">{escape_html(effect)}</td>"
-            f"<td class=\"col-text\">{escape_html(risks)}</td>"
-            f"<td class=\"col-verdict\">{verdict_cell}</td>"
-            f"</tr>"
+    # Рендерится только переданный срез (страница); номер строки — колонка «№»
+    # (для таблиц без неё — индекс), поэтому сохраняется при сортировке и фильтре
+    numbers = df["№"] if "№" in df.columns else pd.Series(df.index + 1, index=df.index)
+    columns = {
+        name: df[name] if name in df.columns else pd.Series("", index=df.index)
+        for name in ("Тезис", "Эффект", "Риски", "Вердикт", "Категория", "Кластер")
+    }
+    rows_html = [
+        _cached_row_html(*fields)
+        for fields in zip(
+            numbers,
+            columns["Тезис"],
+            columns["Эффект"],
+            columns["Риски"],
+            columns["Вердикт"],
+            columns["Категория"],
+            columns["Кластер"],
         )
+    ]
     return """
     <div class="results-table-wrap">
     <table class="results-table">
     <thead>
     <tr>
-    <th>№</th><th>Тезис</th><th>Эффект</th><th>Риски</th><th>Вердикт</th>
+    <th>№</th><th>Тезис</th><th>Эффект</th><th>Риски</th><th>Вердикт</th><th>Кластер</th>
     </tr>
     </thead>
     <tbody>
@@ -0,0 +1,96 @@
+import random
+import re
+import zlib
+from typing import Dict, List, Sequence, Set, Tuple
+
+DEDUP_THRESHOLD = 0.8
+SHINGLE_CHARS = 4
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16
+_PRIME = (1 << 61) - 1
+
+_NON_WORD_RE = re.compile(r"[^\w]+")
+_NUMBER_RE = re.compile(r"\d+")
+_rng = random.Random(20240601)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(MINHASH_PERMUTATIONS)
+]
+
+
+def normalize_thesis(text: str) -> str:
+    # Регистр, «ё», пунктуация и лишние пробелы не влияют на сравнение
+    s = (text or "").lower().replace("ё", "е")
+    return " ".join(_NON_WORD_RE.sub(" ", s).split())
+
+
+def _numbers(normalized: str) -> Tuple[str, ...]:
+    # «Снизить цены на 5%» и «на 50%» почти совпадают по шинглам, но это разные
+    # предложения: тезисы с разными числами в один кластер не попадают
+    return tuple(sorted(_NUMBER_RE.findall(normalized)))
+
+
+def _shingles(normalized: str) -> Set[int]:
+    if len(normalized) <= SHINGLE_CHARS:
+        return {zlib.crc32(normalized.encode("utf-8"))}
+    return {
+        zlib.crc32(normalized[i:i + SHINGLE_CHARS].encode("utf-8"))
+        for i in range(len(normalized) - SHINGLE_CHARS + 1)
+    }
+
+
+def _minhash(shingles: Set[int]) -> Tuple[int, ...]:
+    return tuple(min((a * h + b) % _PRIME for h in shingles) for a, b in _PERMUTATIONS)
+
+
+def _bands(signature: Tuple[int, ...]) -> List[Tuple[int, Tuple[int, ...]]]:
+    rows = MINHASH_PERMUTATIONS // LSH_BANDS
+    return [(band, signature[band * rows:(band + 1) * rows]) for band in range(LSH_BANDS)]
+
+
+def _jaccard(a: Set[int], b: Set[int]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def cluster_theses(theses: Sequence[str], threshold: float = DEDUP_THRESHOLD) -> List[int]:
+    # Для каждого тезиса — индекс представителя его кластера (первого тезиса
+    # кластера по порядку). Сначала совпадение после нормализации, затем
+    # MinHash по символьным шинглам: LSH даёт кандидатов среди представителей,
+    # точное сходство Жаккара проверяется с порогом threshold. Тезис сравнивается
+    # только с представителями, поэтому кластеры не растягиваются по цепочке;
+    # представитель с другим набором чисел не подходит при любом сходстве.
+    representatives: List[int] = []
+    by_text: Dict[str, int] = {}
+    rep_shingles: Dict[int, Set[int]] = {}
+    rep_numbers: Dict[int, Tuple[str, ...]] = {}
+    buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+    for i, thesis in enumerate(theses):
+        normalized = normalize_thesis(thesis)
+        rep = by_text.get(normalized)
+        if rep is not None:
+            representatives.append(rep)
+            continue
+        shingles = _shingles(normalized)
+        numbers = _numbers(normalized)
+        bands = _bands(_minhash(shingles)) if threshold < 1.0 else []
+        best, best_score = i, threshold
+        seen = set()
+        for band in bands:
+            for candidate in buckets.get(band, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                if rep_numbers[candidate] != numbers:
+                    continue
+                score = _jaccard(shingles, rep_shingles[candidate])
+                if score >= best_score:
+                    best, best_score = candidate, score
+        representatives.append(best)
+        by_text[normalized] = best
+        if best == i:
+            rep_shingles[i] = shingles
+            rep_numbers[i] = numbers
+            for band in bands:
+                buckets.setdefault(band, []).append(i)
+    return representatives
@@ -0,0 +1,14 @@
+import math
+
+# Грубая оценка без токенизатора: кириллица в BPE-словарях занимает примерно
+# токен на 2.5 символа, латиница и цифры — токен на 4 символа.
+CYRILLIC_CHARS_PER_TOKEN = 2.5
+OTHER_CHARS_PER_TOKEN = 4.0
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    cyrillic = sum(1 for ch in text if "Ѐ" <= ch <= "ӿ")
+    other = len(text) - cyrillic
+    return math.ceil(cyrillic / CYRILLIC_CHARS_PER_TOKEN + other / OTHER_CHARS_PER_TOKEN)
@@ -1,5 +1,24 @@
+import hashlib
 import re
 
+from services.lru_cache import BoundedLRU
+
+CHAT_HTML_CACHE_MAX_ITEMS = 2000
+CHAT_HTML_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+_HEADING_RE = re.compile(r"^(#{1,3})\s+(.+)$")
+_LIST_ITEM_RE = re.compile(r"^(?:[-*]|\d+\.)\s+(.+)$")
+_BOLD_RE = re.compile(r"\*\*([^*]+)\*\*")
+_ITALIC_RE = re.compile(r"\*([^*]+)\*")
+_CODE_RE = re.compile(r"`([^`]+)`")
+_HR_LINES = ("---", "***", "___")
+
+# HTML готовых сообщений по хэшу роли и текста: при rerun заново
+# рендерятся только новые или изменившиеся сообщения
+_message_html = BoundedLRU(
+    max_items=CHAT_HTML_CACHE_MAX_ITEMS, max_bytes=CHAT_HTML_CACHE_MAX_BYTES
+)
+
 
 def _escape(s: str) -> str:
     return (
@@ -20,53 +39,61 @@ def _content_to_html(content: str) -> str:
     in_list = False
     for line in lines:
         stripped = line.strip()
-        if re.match(r"^###\s+", stripped):
-            if in_list:
-                out.append("</ul>")
-                in_list = False
-            out.append(re.sub(r"^###\s+(.+)$", r"<h3 class=\"chat-h3\">\1</h3>", stripped))
-        elif re.match(r"^##\s+", stripped) and not stripped.startswith("###"):
-            if in_list:
-                out.append("</ul>")
-                in_list = False
-            out.append(re.sub(r"^##\s+(.+)$", r"<h2 class=\"chat-h2\">\1</h2>", stripped))
-        elif re.match(r"^#\s+", stripped) and not stripped.startswith("##"):
-            if in_list:
-                out.append("</ul>")
-                in_list = False
-            out.append(re.sub(r"^#\s+(.+)$", r"<h1 class=\"chat-h1\">\1</h1>", stripped))
-        elif stripped in ("---", "***", "___"):
-            if in_list:
-                out.append("</ul>")
-                in_list = False
-            out.append("<hr class=\"chat-hr\">")
-        elif re.match(r"^[-*]\s+", stripped) or re.match(r"^\d+\.\s+", stripped):
+        heading = _HEADING_RE.match(stripped)
+        item = None if heading else _LIST_ITEM_RE.match(stripped)
+        if item is not None and stripped not in _HR_LINES:
             if not in_list:
                 out.append("<ul class=\"chat-ul\">")
                 in_list = True
-            if re.match(r"^[-*]\s+", stripped):
-                out.append(re.sub(r"^[-*]\s+(.+)$", r"<li>\1</li>", stripped))
-            else:
-                out.append(re.sub(r"^\d+\.\s+(.+)$", r"<li>\1</li>", stripped))
+            out.append(f"<li>{item.group(1)}</li>")
+            continue
+        if in_list:
+            out.append("</ul>")
+            in_list = False
+        if heading:
+            level = len(heading.group(1))
+            out.append(f"<h{level} class=\"chat-h{level}\">{heading.group(2)}</h{level}>")
+        elif stripped in _HR_LINES:
+            out.append("<hr class=\"chat-hr\">")
+        elif stripped:
+            out.append(line)
         else:
-            if in_list:
-                out.append("</ul>")
-                in_list = False
-            if stripped:
-                out.append(line)
-            else:
-                out.append("<br>")
+            out.append("<br>")
     if in_list:
         out.append("</ul>")
     s = "\n".join(out)
-    s = re.sub(r"\*\*([^*]+)\*\*", r"<strong>\1</strong>", s)
-    s = re.sub(r"\*([^*]+)\*", r"<em>\1</em>", s)
-    s = re.sub(r"`([^`]+)`", r"<code class=\"chat-code\">\1</code>", s)
+    s = _BOLD_RE.sub(r"<strong>\1</strong>", s)
+    s = _ITALIC_RE.sub(r"<em>\1</em>", s)
+    s = _CODE_RE.sub(r'<code class="chat-code">\1</code>', s)
     s = s.replace("\n", "<br>")
     return s
 
 
-def build_chat_html(messages: list[dict]) -> str:
+def _message_to_html(role: str, content: str) -> str:
+    body = _content_to_html(content)
+    if role == "user":
+        return (
+            f'<div class="chat-msg chat-msg-user">'
+            f'<span class="chat-msg-role">Вы</span>'
+            f'<div class="chat-msg-content">{body}</div>'
+            f"</div>"
+        )
+    return (
+        f'<div class="chat-msg chat-msg-assistant">'
+        f'<span class="chat-msg-role">Аналитик</span>'
+        f'<div class="chat-msg-content">{body}</div>'
+        f"</div>"
+    )
+
+
+def _cached_message_html(role: str, content: str) -> str:
+    key = hashlib.sha1(f"{role}\x00{content}".encode("utf-8")).hexdigest()
+    return _message_html.get_or_create(key, lambda: _message_to_html(role, content))
+
+
+def build_chat_html(messages: list[dict], live_last: bool = False) -> str:
+    # live_last: последнее сообщение ещё дописывается потоком, его промежуточные
+    # версии не кладутся в кэш, чтобы не вытеснять готовые сообщения
     if not messages:
         return (
             '<div class="chat-static-container">'
@@ -74,23 +101,14 @@ def build_chat_html(messages: list[dict]) -> str:
             "</div>"
         )
     parts = []
-    for msg in messages:
+    last = len(messages) - 1
+    for i, msg in enumerate(messages):
         role = msg.get("role", "user")
-        content = _content_to_html(msg.get("content", ""))
-        if role == "user":
-            parts.append(
-                f'<div class="chat-msg chat-msg-user">'
-                f'<span class="chat-msg-role">Вы</span>'
-                f'<div class="chat-msg-content">{content}</div>'
-                f"</div>"
-            )
+        content = msg.get("content", "") or ""
+        if live_last and i == last:
+            parts.append(_message_to_html(role, content))
         else:
-            parts.append(
-                f'<div class="chat-msg chat-msg-assistant">'
-                f'<span class="chat-msg-role">Аналитик</span>'
-                f'<div class="chat-msg-content">{content}</div>'
-                f"</div>"
-            )
+            parts.append(_cached_message_html(role, content))
     return (
         '<div class="chat-static-container">'
         + "\n".join(parts)
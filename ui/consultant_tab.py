@@ -1,19 +1,28 @@
+import time
 from datetime import datetime
 
 import streamlit as st
 
 from core.config import (
     MAX_CONTEXT_CHARS,
+    ATTACHMENT_MAX_CHARS,
     CHAT_MAX_TOKENS,
     CHAT_MAX_TOKENS_SHORT,
     CHAT_PLACEHOLDER_MESSAGE,
+    CHAT_HISTORY_TOKEN_BUDGET,
 )
-from modules.api_handler import chat_completion_with_history
+from core.state import get_session_id
+from modules.api_handler import StreamError, stream_chat_completion_with_history
 from modules.prompts import CONSULTANT_SYSTEM, CONSULTANT_SYSTEM_SHORT
-from modules.export_utils import export_chat_txt, export_chat_md, export_chat_docx
+from modules.export_utils import ChatExporter
+from services.chat_history import build_user_message, compact_history
+from services.context_ranker import select_context
 from services.file_parser import read_uploaded_file_as_text
 from ui.chat_ui import build_chat_html
 
+STREAM_RENDER_INTERVAL = 0.08
+STREAM_CURSOR = "▌"
+
 
 def render_consultant_tab(api_key: str, model: str) -> None:
     st.markdown("## Консультант-аналитик")
@@ -22,6 +31,8 @@ def render_consultant_tab(api_key: str, model: str) -> None:
     messages = st.session_state.get("chat_messages", [])
     pending = st.session_state.get("chat_pending_response", False)
 
+    chat_placeholder = st.empty()
+
     if pending and messages:
         last = messages[-1]
         if last.get("role") == "assistant" and last.get("content") == CHAT_PLACEHOLDER_MESSAGE:
@@ -29,25 +40,14 @@ def render_consultant_tab(api_key: str, model: str) -> None:
             short = st.session_state.get("consultant_short_mode", False)
             system = CONSULTANT_SYSTEM_SHORT if short else CONSULTANT_SYSTEM
             max_tokens = CHAT_MAX_TOKENS_SHORT if short else CHAT_MAX_TOKENS
-            with st.spinner("Анализирую..."):
-                ok, reply = chat_completion_with_history(
-                    api_key,
-                    model,
-                    system,
-                    history_for_api,
-                    max_tokens=max_tokens,
-                )
-            st.session_state["chat_pending_response"] = False
-            if ok:
-                st.session_state["chat_messages"] = history_for_api + [
-                    {"role": "assistant", "content": reply}
-                ]
-            else:
-                st.session_state["chat_messages"] = history_for_api
-                st.error(reply)
+            _stream_reply(chat_placeholder, api_key, model, system, history_for_api, max_tokens)
             st.rerun()
 
-    st.markdown(build_chat_html(messages), unsafe_allow_html=True)
+    chat_error = st.session_state.pop("chat_error", "")
+    if chat_error:
+        st.error(chat_error)
+
+    chat_placeholder.markdown(build_chat_html(messages), unsafe_allow_html=True)
 
     # Блок «файл + поле ввода» — визуально один блок
     st.markdown(
@@ -61,26 +61,32 @@ def render_consultant_tab(api_key: str, model: str) -> None:
             key="consultant_upload",
         )
         if consultant_file:
-            st.session_state["consultant_file_context"] = read_uploaded_file_as_text(
-                consultant_file, max_chars=MAX_CONTEXT_CHARS
-            )
+            file_text = read_uploaded_file_as_text(consultant_file, max_chars=ATTACHMENT_MAX_CHARS)
+            st.session_state["consultant_file_context"] = file_text
             st.caption(f"Файл «{consultant_file.name}» прикреплён и будет учтён при отправке.")
+            if len(file_text) > MAX_CONTEXT_CHARS:
+                st.caption("Файл большой: в запрос попадут фрагменты, наиболее близкие к вопросу.")
         else:
             st.session_state["consultant_file_context"] = ""
 
     user_input = st.chat_input("Опишите ситуацию для анализа...")
 
     ts = datetime.now().strftime("%Y%m%d_%H%M")
+    exporter = st.session_state.get("chat_exporter")
+    if exporter is None:
+        exporter = st.session_state["chat_exporter"] = ChatExporter()
     c1, c2, c3, c4 = st.columns(4)
     with c1:
         if st.button("Очистить историю", key="clear_chat"):
             st.session_state["chat_messages"] = []
             st.session_state["chat_pending_response"] = False
+            st.session_state["chat_summary_cache"] = {}
+            st.session_state["chat_exporter"] = ChatExporter()
             st.rerun()
     with c2:
         st.download_button(
             "Скачать TXT",
-            data=export_chat_txt(messages) if messages else "",
+            data=exporter.txt(messages) if messages else "",
             file_name=f"dialog_{ts}.txt",
             mime="text/plain",
             key="dl_chat_txt",
@@ -89,32 +95,38 @@ def render_consultant_tab(api_key: str, model: str) -> None:
     with c3:
         st.download_button(
             "Скачать MD",
-            data=export_chat_md(messages) if messages else "",
+            data=exporter.md(messages) if messages else "",
             file_name=f"dialog_{ts}.md",
             mime="text/markdown",
             key="dl_chat_md",
             disabled=not messages,
         )
     with c4:
-        st.download_button(
-            "Выгрузить в Word (DOCX)",
-            data=export_chat_docx(messages) if messages else b"",
-            file_name=f"dialog_{ts}.docx",
-            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            key="dl_chat_docx",
-            disabled=not messages,
-        )
+        # DOCX собирается только по нажатию и переиспользуется, пока диалог не изменился
+        docx_data = exporter.docx_ready(messages) if messages else None
+        if docx_data is None and st.button(
+            "Подготовить Word (DOCX)",
+            key="prepare_chat_docx",
+            disabled=not messages or pending,
+        ):
+            docx_data = exporter.docx(messages)
+        if docx_data is not None:
+            st.download_button(
+                "Выгрузить в Word (DOCX)",
+                data=docx_data,
+                file_name=f"dialog_{ts}.docx",
+                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                key="dl_chat_docx",
+            )
 
     if not user_input:
         return
 
-    context = st.session_state.get("consultant_file_context", "")
-    full_user_message = user_input
-    if context:
-        full_user_message = (
-            f"Контекст из прикреплённого файла:\n\n{context}\n\n"
-            f"---\nВопрос/ситуация:\n{user_input}"
-        )
+    # Из длинного вложения в запрос идут только релевантные вопросу фрагменты
+    context = select_context(
+        st.session_state.get("consultant_file_context", ""), user_input, MAX_CONTEXT_CHARS
+    )
+    full_user_message = build_user_message(user_input, context)
 
     st.session_state["chat_messages"] = st.session_state.get("chat_messages", []) + [
         {"role": "user", "content": full_user_message}
@@ -130,3 +142,59 @@ def render_consultant_tab(api_key: str, model: str) -> None:
     ]
     st.session_state["chat_pending_response"] = True
     st.rerun()
+
+
+def _stream_reply(
+    chat_placeholder,
+    api_key: str,
+    model: str,
+    system: str,
+    history_for_api: list[dict],
+    max_tokens: int,
+) -> None:
+    chat_placeholder.markdown(
+        build_chat_html(
+            history_for_api + [{"role": "assistant", "content": CHAT_PLACEHOLDER_MESSAGE}]
+        ),
+        unsafe_allow_html=True,
+    )
+    summary, api_messages = compact_history(
+        history_for_api,
+        CHAT_HISTORY_TOKEN_BUDGET,
+        st.session_state.setdefault("chat_summary_cache", {}),
+    )
+    if summary:
+        system = f"{system}\n\n{summary}"
+    parts = []
+    last_render = 0.0
+    # finally срабатывает и при ошибке, и при прерывании скрипта (новый rerun):
+    # уже полученный текст остаётся в истории.
+    try:
+        for delta in stream_chat_completion_with_history(
+            api_key,
+            model,
+            system,
+            api_messages,
+            max_tokens=max_tokens,
+            session_id=get_session_id("chat"),
+        ):
+            parts.append(delta)
+            now = time.monotonic()
+            if now - last_render >= STREAM_RENDER_INTERVAL:
+                last_render = now
+                chat_placeholder.markdown(
+                    build_chat_html(
+                        history_for_api
+                        + [{"role": "assistant", "content": "".join(parts) + STREAM_CURSOR}],
+                        live_last=True,
+                    ),
+                    unsafe_allow_html=True,
+                )
+    except StreamError as e:
+        st.session_state["chat_error"] = str(e)
+    finally:
+        reply = "".join(parts).strip()
+        st.session_state["chat_pending_response"] = False
+        st.session_state["chat_messages"] = history_for_api + (
+            [{"role": "assistant", "content": reply}] if reply else []
+        )
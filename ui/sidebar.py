@@ -2,8 +2,12 @@ from typing import Tuple
 
 import streamlit as st
 
-from core.config import DEFAULT_MODEL, MODELS
+from core.config import AUTO_MODEL, AUTO_MODEL_LABEL, DEFAULT_MODEL, MODELS
+from core.state import get_session_id
 from modules.api_handler import check_connection
+from modules.model_router import get_router
+from modules.rate_limiter import get_scheduler
+from modules.response_cache import get_response_cache
 
 
 def render_sidebar() -> Tuple[str, str]:
@@ -16,14 +20,17 @@ def render_sidebar() -> Tuple[str, str]:
         placeholder="sk-or-v1-...",
     )
     st.session_state["api_key"] = api_key
+    model_options = MODELS + [AUTO_MODEL]
     model = st.sidebar.selectbox(
         "Модель",
-        MODELS,
-        index=MODELS.index(DEFAULT_MODEL) if DEFAULT_MODEL in MODELS else 0,
+        model_options,
+        index=model_options.index(DEFAULT_MODEL) if DEFAULT_MODEL in model_options else 0,
+        format_func=lambda m: AUTO_MODEL_LABEL if m == AUTO_MODEL else m,
+        help="При сбое выбранной модели запрос автоматически уходит на следующую из списка.",
     )
     if st.sidebar.button("Проверить подключение", use_container_width=True):
         if api_key:
-            ok, msg = check_connection(api_key, model)
+            ok, msg = check_connection(api_key, model, session_id=get_session_id())
             if ok:
                 st.session_state["api_status"] = "Подключено"
                 st.sidebar.success(msg)
@@ -34,6 +41,24 @@ def render_sidebar() -> Tuple[str, str]:
             st.sidebar.error("Введите API ключ")
     if st.session_state.get("api_status"):
         st.sidebar.caption(f"Статус: {st.session_state['api_status']}")
+    cache_stats = get_response_cache().stats()
+    st.sidebar.caption(
+        f"Кэш ответов: попаданий {cache_stats['hits']}, промахов {cache_stats['misses']}, "
+        f"записей {cache_stats['entries']}"
+    )
+    queue_stats = get_scheduler().stats()
+    st.sidebar.caption(
+        f"Очередь API: {queue_stats['queued']} запросов, "
+        f"ожидание в среднем {queue_stats['avg_wait']:.1f} с "
+        f"(макс. {queue_stats['max_wait']:.1f} с)"
+    )
+    with st.sidebar.expander("Состояние моделей", expanded=False):
+        for name, info in get_router().stats().items():
+            p50 = f"{info['p50']:.1f} с" if info["p50"] is not None else "нет данных"
+            state = "недоступна" if info["state"] == "open" else "доступна"
+            st.caption(
+                f"{name}: {state}, медиана {p50}, ошибок {info['error_rate']:.0%}"
+            )
     st.sidebar.markdown("---")
     consultant_mode = st.sidebar.radio(
         "Ответ консультанта",
@@ -1,20 +1,91 @@
+import math
+import time
+from collections import Counter
 from datetime import datetime
+from typing import Iterator, Optional
 
 import pandas as pd
 import streamlit as st
 
-from core.config import SWOT_UPLOAD_TYPES
-from modules.api_handler import chat_completion
-from modules.prompts import SWOT_TEMPLATES
+from core.config import (
+    SWOT_UPLOAD_TYPES,
+    SWOT_MAX_THESES,
+    SWOT_MAX_CONCURRENCY,
+    SWOT_MAX_CONCURRENCY_LIMIT,
+    SWOT_ROW_MAX_TOKENS,
+    SWOT_PACK_MAX_TOKENS,
+    SWOT_HEDGE_MAX_SHARE,
+    SWOT_POLL_INTERVAL,
+    SWOT_PROGRESS_ROWS,
+    SWOT_DEDUP_THRESHOLD,
+    SWOT_PARTIAL_INTERVAL,
+    VERDICT_CATEGORIES,
+    VERDICT_ERROR,
+)
+from core.state import get_session_id
+from modules.api_handler import (
+    CANCELLED_MESSAGE,
+    HedgeBudget,
+    StreamError,
+    chat_completion,
+    is_rate_limited,
+    stream_chat_completion_with_history,
+)
+from modules.prompts import SWOT_TEMPLATES, SWOT_BATCH_INSTRUCTION
 from modules.export_utils import (
+    SwotStreamParser,
     parse_swot_response,
+    parse_swot_batch_response,
     export_swot_xlsx,
     export_swot_csv,
     export_swot_md,
     export_swot_docx,
 )
+from services.export_cache import cached_export
 from services.file_parser import parse_theses_from_text, parse_theses_from_upload
-from services.swot_ui import build_results_table_html
+from services.swot_batch import run_batch, pack_theses
+from services.results_buffer import RESULT_COLUMNS
+from services.thesis_dedup import cluster_theses
+from services.swot_jobs import (
+    JOB_CANCELLED,
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_TTL,
+    SwotJob,
+    get_job_manager,
+)
+from services.swot_ui import (
+    build_results_table_html,
+    filter_results,
+    page_count,
+    results_page,
+    sort_results,
+)
+
+# Подпись -> (колонка, по убыванию); None — исходный порядок тезисов
+RESULTS_SORT_OPTIONS = {
+    "По номеру": (None, False),
+    "По вердикту": ("Категория", False),
+    "По тезису": ("Тезис", False),
+    "Сначала последние": (None, True),
+}
+RESULTS_PAGE_SIZES = [25, 50, 100]
+JOB_COOKIE_PREFIX = "swot_job_"
+
+SWOT_EXPORT_FORMATS = {
+    "Excel (XLSX)": (
+        "xlsx",
+        export_swot_xlsx,
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ),
+    "Word (DOCX)": (
+        "docx",
+        export_swot_docx,
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ),
+    "CSV": ("csv", export_swot_csv, "text/csv"),
+    "Markdown": ("md", export_swot_md, "text/markdown"),
+}
 
 
 def render_swot_tab(api_key: str, model: str) -> None:
@@ -40,20 +111,22 @@ def render_swot_tab(api_key: str, model: str) -> None:
         theses_list = parse_theses_from_text(raw_text or "")
     else:
         swot_file = st.file_uploader(
-            "Перетащите файл сюда или выберите файл (.txt, .csv, .xlsx)",
+            "Перетащите файл сюда или выберите файл (.txt, .csv, .xlsx, .docx)",
             type=SWOT_UPLOAD_TYPES,
             key="swot_file",
         )
         if swot_file:
-            theses_list = parse_theses_from_upload(swot_file)
+            theses_list = parse_theses_from_upload(swot_file, max_theses=SWOT_MAX_THESES)
             if theses_list:
                 st.success(
                     f"Загружен файл «{swot_file.name}». Найдено тезисов: {len(theses_list)}"
                 )
+                if len(theses_list) >= SWOT_MAX_THESES:
+                    st.info(f"Из файла взяты первые {SWOT_MAX_THESES} тезисов.")
             else:
                 st.warning(
                     f"Файл «{swot_file.name}» загружен, но тезисы не найдены. "
-                    "Проверьте формат: один тезис на строку или один столбец в таблице."
+                    "Проверьте формат: один тезис на строку (абзац) или один столбец в таблице."
                 )
 
     st.markdown("**Шаг 2. Настройки анализа**")
@@ -68,101 +141,432 @@ def render_swot_tab(api_key: str, model: str) -> None:
     system_prompt = (
         custom_prompt.strip() if custom_prompt.strip() else SWOT_TEMPLATES[prompt_template]
     )
+    concurrency = st.slider(
+        "Параллельных запросов",
+        min_value=1,
+        max_value=SWOT_MAX_CONCURRENCY_LIMIT,
+        value=SWOT_MAX_CONCURRENCY,
+        key="swot_concurrency",
+        help="При превышении лимита API число запросов автоматически снижается.",
+    )
+    pack = st.checkbox(
+        "Несколько тезисов в одном запросе",
+        value=False,
+        key="swot_pack",
+        help="Тезисы группируются в пакеты: меньше запросов и повторов системного промта. "
+        "Тезисы без корректного ответа в пакете перезапрашиваются по одному.",
+    )
+    hedge = st.checkbox(
+        "Дублировать зависшие запросы",
+        value=False,
+        key="swot_hedge",
+        help="Если ответ задерживается дольше обычного (p90), отправляется второй такой же "
+        f"запрос и берётся первый ответ. Не более {SWOT_HEDGE_MAX_SHARE:.0%} строк прогона.",
+    )
+
+    dedup = st.checkbox(
+        "Объединять похожие тезисы",
+        value=False,
+        key="swot_dedup",
+        help="Повторяющиеся и перефразированные тезисы анализируются один раз, "
+        "вердикт копируется во все строки кластера. Тезисы с разными числами "
+        "не объединяются.",
+    )
+    dedup_threshold = None
+    if dedup:
+        dedup_threshold = st.slider(
+            "Порог похожести",
+            min_value=0.5,
+            max_value=1.0,
+            value=SWOT_DEDUP_THRESHOLD,
+            step=0.05,
+            key="swot_dedup_threshold",
+            help="1.0 — только совпадающие после нормализации; ниже — объединяются и перефразировки.",
+        )
 
-    if st.button("Начать анализ", key="run_swot", type="primary"):
+    job = _current_job()
+    if st.button(
+        "Начать анализ",
+        key="run_swot",
+        type="primary",
+        disabled=job is not None and job.active,
+    ):
         if not theses_list:
             st.warning("Добавьте хотя бы один тезис.")
         elif not api_key:
             st.error("Введите API ключ в боковой панели и проверьте подключение.")
         else:
-            _run_swot_analysis(
+            job = _start_swot_job(
                 api_key=api_key,
                 model=model,
                 system_prompt=system_prompt,
                 theses_list=theses_list,
+                concurrency=concurrency,
+                pack=pack,
+                hedge=hedge,
+                dedup_threshold=dedup_threshold,
             )
 
+    if job is not None:
+        _render_job_state(job)
+
     swot_results = st.session_state.get("swot_results")
     if swot_results:
         st.markdown("**Шаг 3. Результаты**")
         df = pd.DataFrame(swot_results)
-        verdicts = [v for v in df["Вердикт"].dropna().unique().tolist() if v]
+        df["Категория"] = pd.Categorical(df["Категория"], categories=VERDICT_CATEGORIES)
+        counts = df["Категория"].value_counts()
+        categories = [c for c in VERDICT_CATEGORIES if counts.get(c, 0)]
         filter_verdict = st.multiselect(
             "Фильтр по вердикту",
-            verdicts,
-            default=verdicts,
+            categories,
+            default=categories,
+            format_func=lambda c: f"{c} ({counts[c]})",
             key="swot_filter",
         )
-        df_f = df[df["Вердикт"].isin(filter_verdict)] if filter_verdict else df
-        st.markdown(build_results_table_html(df_f), unsafe_allow_html=True)
+        col_search, col_sort, col_size = st.columns([3, 2, 1])
+        with col_search:
+            query = st.text_input("Поиск по тексту", key="swot_search")
+        with col_sort:
+            sort_label = st.selectbox("Сортировка", list(RESULTS_SORT_OPTIONS), key="swot_sort")
+        with col_size:
+            page_size = st.selectbox("На странице", RESULTS_PAGE_SIZES, key="swot_page_size")
+        sort_by, descending = RESULTS_SORT_OPTIONS[sort_label]
+        df_f = sort_results(filter_results(df, filter_verdict, query), sort_by, descending)
+        # На экран уходит только текущая страница, а не вся таблица
+        pages = page_count(len(df_f), page_size)
+        if st.session_state.get("swot_page", 1) > pages:
+            st.session_state["swot_page"] = pages
+        page = st.number_input(
+            f"Страница (всего {pages}, строк {len(df_f)})",
+            min_value=1,
+            max_value=pages,
+            step=1,
+            key="swot_page",
+        )
+        st.markdown(
+            build_results_table_html(results_page(df_f, page, page_size)),
+            unsafe_allow_html=True,
+        )
 
         st.markdown("**Выгрузка результатов**")
         ts = datetime.now().strftime("%Y%m%d_%H%M")
-        ex1, ex2, ex3, ex4 = st.columns(4)
-        with ex1:
-            st.download_button(
-                "Выгрузить в Excel (XLSX)",
-                data=export_swot_xlsx(df_f),
-                file_name=f"swot_analysis_{ts}.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                key="dl_xlsx",
-            )
-        with ex2:
-            st.download_button(
-                "Выгрузить в Word (DOCX)",
-                data=export_swot_docx(df_f),
-                file_name=f"swot_analysis_{ts}.docx",
-                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                key="dl_docx",
-            )
-        with ex3:
-            st.download_button(
-                "Скачать CSV",
-                data=export_swot_csv(df_f),
-                file_name=f"swot_analysis_{ts}.csv",
-                mime="text/csv",
-                key="dl_csv",
-            )
-        with ex4:
-            st.download_button(
-                "Скачать Markdown",
-                data=export_swot_md(df_f),
-                file_name=f"swot_analysis_{ts}.md",
-                mime="text/markdown",
-                key="dl_md",
-            )
+        # Собирается только выбранный формат (по умолчанию самый дешёвый — CSV),
+        # готовые файлы берутся из кэша
+        export_labels = list(SWOT_EXPORT_FORMATS.keys())
+        export_label = st.radio(
+            "Формат",
+            export_labels,
+            index=export_labels.index("CSV"),
+            horizontal=True,
+            key="swot_export_format",
+        )
+        fmt, build, mime = SWOT_EXPORT_FORMATS[export_label]
+        st.download_button(
+            f"Скачать {export_label}",
+            data=cached_export(df_f, fmt, build),
+            file_name=f"swot_analysis_{ts}.{fmt}",
+            mime=mime,
+            key=f"dl_{fmt}",
+        )
 
 
-def _run_swot_analysis(
-    api_key: str,
-    model: str,
-    system_prompt: str,
-    theses_list: list,
-) -> None:
-    st.session_state["swot_results"] = []
-    progress_bar = st.progress(0)
-    status_placeholder = st.empty()
-    table_placeholder = st.empty()
-    n = len(theses_list)
-    for i, thesis in enumerate(theses_list):
-        status_placeholder.caption(f"Обработка: {i + 1} из {n}")
-        progress_bar.progress((i + 1) / n)
-        ok, content = chat_completion(
+def _error_row(thesis: str, content: str) -> dict:
+    row = parse_swot_response(thesis, content)
+    row["Вердикт"] = VERDICT_ERROR
+    row["Категория"] = VERDICT_ERROR
+    row["Эффект"] = content[:200]
+    return row
+
+
+def _iter_swot_rows(job: SwotJob, indices: list[int]) -> Iterator[tuple[int, dict]]:
+    # Запросы уходят только за представителей кластеров похожих тезисов,
+    # готовая строка копируется всем недостающим строкам кластера. Кластеры
+    # считаются здесь, в фоне, а не по кнопке; продолжение задачи их не пересчитывает
+    theses_list = job.params["theses"]
+    clusters = job.params.get("clusters")
+    if clusters is None:
+        threshold = job.params["dedup_threshold"]
+        clusters = (
+            cluster_theses(theses_list, threshold)
+            if threshold is not None
+            else list(range(len(theses_list)))
+        )
+        job.params["clusters"] = clusters
+    sizes = Counter(clusters)
+    members: dict[int, list[int]] = {}
+    for i in indices:
+        members.setdefault(clusters[i], []).append(i)
+
+    def _fan_out(rep: int, row: dict) -> Iterator[tuple[int, dict]]:
+        cluster = rep + 1 if sizes[rep] > 1 else ""
+        for i in members[rep]:
+            thesis = row["Тезис"] if i == rep else theses_list[i][:500]
+            yield i, {**row, "Тезис": thesis, "Кластер": cluster}
+
+    pending = []
+    for rep in members:
+        if job.rows[rep] is not None:
+            yield from _fan_out(rep, job.rows[rep])
+        else:
+            pending.append(rep)
+    for rep, row in _iter_analyzed_rows(job, sorted(pending)):
+        yield from _fan_out(rep, row)
+
+
+def _iter_analyzed_rows(job: SwotJob, indices: list[int]) -> Iterator[tuple[int, dict]]:
+    params = job.params
+    api_key = params["api_key"]
+    model = params["model"]
+    system_prompt = params["system_prompt"]
+    theses_list = params["theses"]
+    concurrency = params["concurrency"]
+    session_id = params["session_id"]
+    hedge_budget = (
+        HedgeBudget(math.ceil(len(indices) * SWOT_HEDGE_MAX_SHARE)) if params["hedge"] else None
+    )
+
+    def _analyze(thesis: str) -> tuple[bool, str]:
+        return chat_completion(
             api_key,
             model,
             system_prompt,
             thesis,
             temperature=0.5,
-            max_tokens=600,
+            max_tokens=SWOT_ROW_MAX_TOKENS,
+            session_id=session_id,
+            hedge=hedge_budget,
+        )
+
+    def _analyze_batch(batch: list[int]) -> tuple[bool, str]:
+        if len(batch) == 1:
+            return _analyze(theses_list[batch[0]])
+        numbered = "\n".join(
+            f"{k}. {theses_list[i]}" for k, i in enumerate(batch, start=1)
+        )
+        return chat_completion(
+            api_key,
+            model,
+            system_prompt,
+            f"{SWOT_BATCH_INSTRUCTION}\n\n{numbered}",
+            temperature=0.5,
+            max_tokens=min(SWOT_ROW_MAX_TOKENS * len(batch), SWOT_PACK_MAX_TOKENS),
+            session_id=session_id,
+            hedge=hedge_budget,
+        )
+
+    def _analyze_streaming(index: int) -> tuple[bool, str]:
+        # Поля строки разбираются по мере генерации и сразу видны в прогрессе
+        if job.cancel_event.is_set():
+            return False, CANCELLED_MESSAGE
+        thesis = theses_list[index]
+        parser = SwotStreamParser(thesis)
+        parts = []
+        last_update = 0.0
+        stream = stream_chat_completion_with_history(
+            api_key,
+            model,
+            system_prompt,
+            [{"role": "user", "content": thesis}],
+            temperature=0.5,
+            max_tokens=SWOT_ROW_MAX_TOKENS,
+            session_id=session_id,
+            cancel=job.cancel_event,
         )
-        row = parse_swot_response(thesis, content if ok else content)
+        try:
+            for delta in stream:
+                parts.append(delta)
+                row = parser.feed(delta)
+                now = time.monotonic()
+                if now - last_update >= SWOT_PARTIAL_INTERVAL:
+                    job.set_partial(index, row)
+                    last_update = now
+                if job.cancel_event.is_set():
+                    return False, CANCELLED_MESSAGE
+        except StreamError as e:
+            return False, str(e)
+        finally:
+            stream.close()
+        return True, "".join(parts).strip()
+
+    def _analyze_index(index: int) -> tuple[bool, str]:
+        if hedge_budget is None:
+            return _analyze_streaming(index)
+        return _analyze(theses_list[index])
+
+    def _single(batch: list[int]) -> Iterator[tuple[int, dict]]:
+        for j, (ok, content) in run_batch(
+            batch,
+            _analyze_index,
+            max_workers=concurrency,
+            is_rate_limited=is_rate_limited,
+            stop=job.cancel_event,
+        ):
+            if not ok and content == CANCELLED_MESSAGE:
+                # Прерванная остановкой строка остаётся недообработанной
+                continue
+            thesis = theses_list[batch[j]]
+            yield batch[j], (
+                parse_swot_response(thesis, content) if ok else _error_row(thesis, content)
+            )
+
+    if not params["pack"]:
+        yield from _single(indices)
+        return
+
+    batches = [
+        [indices[k] for k in group]
+        for group in pack_theses([theses_list[i] for i in indices])
+    ]
+    retry = []
+    for b, (ok, content) in run_batch(
+        batches,
+        _analyze_batch,
+        max_workers=concurrency,
+        is_rate_limited=is_rate_limited,
+        stop=job.cancel_event,
+    ):
+        batch = batches[b]
         if not ok:
-            row["Вердикт"] = "Ошибка"
-            row["Эффект"] = content[:200]
-        st.session_state["swot_results"].append(row)
-        df_so_far = pd.DataFrame(st.session_state["swot_results"])
-        table_placeholder.dataframe(df_so_far, width="stretch", hide_index=True)
-    progress_bar.empty()
-    status_placeholder.empty()
-    st.success("Анализ завершён.")
-    st.rerun()
+            for i in batch:
+                yield i, _error_row(theses_list[i], content)
+            continue
+        if len(batch) == 1:
+            yield batch[0], parse_swot_response(theses_list[batch[0]], content)
+            continue
+        rows = parse_swot_batch_response([theses_list[i] for i in batch], content)
+        for i, row in zip(batch, rows):
+            if row is None:
+                retry.append(i)
+            else:
+                yield i, row
+    if retry and not job.cancel_event.is_set():
+        yield from _single(sorted(retry))
+
+
+def _current_job() -> Optional[SwotJob]:
+    # После переподключения сессия новая: задача находится по id из адреса страницы,
+    # а токен владельца — в cookie браузера, который её запустил. По скопированной
+    # ссылке с ?job=... чужая задача не открывается.
+    job_id = st.session_state.get("swot_job_id") or st.query_params.get("job")
+    if not job_id:
+        return None
+    token = st.session_state.get("swot_job_token") or st.context.cookies.get(
+        JOB_COOKIE_PREFIX + job_id
+    )
+    job = get_job_manager().get(job_id, token)
+    if job is None:
+        st.session_state.pop("swot_job_id", None)
+        st.session_state.pop("swot_job_token", None)
+        if st.query_params.get("job") == job_id:
+            del st.query_params["job"]
+        return None
+    st.session_state["swot_job_id"] = job.id
+    st.session_state["swot_job_token"] = token
+    return job
+
+
+def _remember_job_token(job: SwotJob) -> None:
+    # Cookie читается при следующем подключении этого же браузера (st.context.cookies)
+    st.html(
+        f"<script>document.cookie = '{JOB_COOKIE_PREFIX}{job.id}={job.token}; "
+        f"path=/; max-age={int(JOB_TTL)}; SameSite=Strict';</script>",
+        unsafe_allow_javascript=True,
+    )
+
+
+def _start_swot_job(
+    api_key: str,
+    model: str,
+    system_prompt: str,
+    theses_list: list,
+    concurrency: int = SWOT_MAX_CONCURRENCY,
+    pack: bool = False,
+    hedge: bool = False,
+    dedup_threshold: Optional[float] = None,
+) -> SwotJob:
+    params = {
+        "api_key": api_key,
+        "model": model,
+        "system_prompt": system_prompt,
+        "theses": list(theses_list),
+        "concurrency": concurrency,
+        "pack": pack,
+        "hedge": hedge,
+        "session_id": get_session_id("swot"),
+        "dedup_threshold": dedup_threshold,
+    }
+    job = get_job_manager().submit(
+        get_session_id(), len(theses_list), params, _iter_swot_rows
+    )
+    st.session_state["swot_job_id"] = job.id
+    st.session_state["swot_job_token"] = job.token
+    st.session_state["swot_results"] = None
+    st.query_params["job"] = job.id
+    return job
+
+
+def _render_job_state(job: SwotJob) -> None:
+    _remember_job_token(job)
+    if job.active:
+        _render_job_progress(job.id, job.token)
+        return
+    _render_dedup_caption(job)
+    st.session_state["swot_results"] = job.results()
+    if job.status == JOB_FAILED:
+        st.error(f"Анализ прерван ошибкой: {job.error}")
+    if job.status in (JOB_CANCELLED, JOB_FAILED):
+        st.info(f"Готово {job.done_count} из {job.total}. Оставшиеся тезисы можно дообработать.")
+        if st.button("Продолжить анализ", key="resume_swot"):
+            get_job_manager().resume(job.id, job.token, _iter_swot_rows)
+            st.rerun()
+
+
+@st.fragment(run_every=SWOT_POLL_INTERVAL)
+def _render_dedup_caption(job: SwotJob) -> None:
+    clusters = job.params.get("clusters")
+    if clusters is None:
+        if job.params.get("dedup_threshold") is not None:
+            st.caption("Поиск похожих тезисов…")
+        return
+    requests_needed = len(set(clusters))
+    if requests_needed < job.total:
+        st.caption(
+            f"Похожие тезисы объединены: {job.total} тезисов, {requests_needed} уникальных "
+            "для анализа. Номер кластера — номер тезиса, за который получен вердикт."
+        )
+
+
+def _render_job_progress(job_id: str, token: str) -> None:
+    # Фрагмент перерисовывается по таймеру и не держит поток скрипта. На экране —
+    # только последние SWOT_PROGRESS_ROWS готовых строк: объём каждого опроса
+    # не растёт с длиной прогона, вся таблица показывается после завершения
+    job = get_job_manager().get(job_id, token)
+    if job is None or not job.active:
+        st.rerun()
+        return
+    done = job.done_count
+    st.progress(done / job.total if job.total else 1.0)
+    if job.status == JOB_QUEUED:
+        ahead = get_job_manager().queue_position(job)
+        st.caption(
+            f"Задача в очереди: перед ней {ahead} задач других участников. "
+            "Анализ начнётся автоматически, страницу можно закрыть."
+        )
+    else:
+        st.caption(
+            f"Обработано: {done} из {job.total}. "
+            "Анализ идёт в фоне и продолжится, даже если закрыть страницу."
+        )
+    _render_dedup_caption(job)
+    if st.button("Остановить", key="cancel_swot"):
+        get_job_manager().cancel(job_id, token)
+    if len(job.buffer):
+        if len(job.buffer) > SWOT_PROGRESS_ROWS:
+            st.caption(f"Последние {SWOT_PROGRESS_ROWS} готовых строк:")
+        st.dataframe(job.buffer.tail(SWOT_PROGRESS_ROWS), width="stretch", hide_index=True)
+    partial = job.partial_rows()
+    if partial:
+        st.dataframe(
+            pd.DataFrame(partial, columns=RESULT_COLUMNS), width="stretch", hide_index=True
+        )